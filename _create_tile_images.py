@@ -3,18 +3,13 @@
 # However, if you want to modify the tile images (for example, you want different colors),
 # you can alter this script accordingly and run it to generate new images.
 
+from constants import TILE_CONFIGS
+
 from PIL import Image, ImageDraw
 import math
 
 # the tile colors, row-by-row. Each tile is tilted with a multiple of 30 degrees in the end.
-CONFIGS = [("orange", "blue",   "white",   0),
-           ("green",  "orange", "white", -30),
-           ("red",    "green",  "white",   0),
-           ("blue",   "red",    "white", -30),
-           ("yellow", "blue",   "orange", 30),
-           ("yellow", "orange", "green",  60),
-           ("yellow", "green",  "red",    30),
-           ("yellow", "red",    "blue",   60)]
+CONFIGS = TILE_CONFIGS
 
 IMAGE_SIZE = 280
 SQUARE_SIZE = 100
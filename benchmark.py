@@ -0,0 +1,147 @@
+# A repeatable, headless benchmark of the state engine, the animation and the rendering paths. The results are printed
+# as JSON, so runs on different commits can be compared, for example:
+#   python benchmark.py > before.json; (change the code); python benchmark.py > after.json
+#
+# Every benchmark runs its function in a loop, and the fastest of several repeats is reported, which is the least
+# disturbed by other processes.
+
+from constants import STICKER_PERMUTATION_R, CW_R_TURN_CONFIG, F2_TURN_CONFIG
+
+import argparse
+import json
+import os
+import platform
+import time
+
+# the dummy video driver renders to memory, without a window; it has to be set before pygame is imported
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+from hedgehog2d import Hedgehog2D
+from puzzle_state import solved_states, apply_move
+import numpy as np
+import pygame
+
+SPEEDS = (1, 50, 100)  # slider values for the animation benchmarks
+
+
+def measure(function, number: int, repeat: int) -> dict:
+    """Call the function number times in each of repeat rounds, and return the statistics of the fastest round."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        best = min(best, time.perf_counter() - start)
+    return {"calls": number, "microseconds_per_call": best / number * 1e6, "calls_per_second": number / best}
+
+
+def _click_event(hedgehog: Hedgehog2D, button_id: str) -> pygame.event.Event:
+    return pygame.event.Event(pygame.MOUSEBUTTONDOWN, pos=hedgehog.buttons[button_id].rect.center, button=1)
+
+
+def _keep_animating(hedgehog: Hedgehog2D):
+    """Start a new turn if the tiles came to rest, so that every measured frame has moving tiles."""
+    if not any(hedgehog.animator.is_animating()):
+        hedgehog.do_move("F2")
+
+
+def run_benchmarks(number: int, repeat: int) -> dict:
+    hedgehog = Hedgehog2D()
+    results = {}
+
+    # state engine
+    model3d = hedgehog.model3d
+    results["model3d_permute_stickers"] = measure(lambda: model3d.permute_stickers(STICKER_PERMUTATION_R), number, repeat)
+    results["model3d_permute_stickers_repetition_3"] = measure(
+        lambda: model3d.permute_stickers(STICKER_PERMUTATION_R, repetition=3), number, repeat)
+    # apply_move must not write into its input, so the batch goes back and forth between two preallocated buffers
+    buffers = [solved_states(10000), solved_states(10000)]
+
+    def apply_move_batch():
+        apply_move(buffers[0], "R", out=buffers[1])
+        buffers.reverse()
+
+    results["puzzle_state_apply_move_batch_10000"] = measure(apply_move_batch, number, repeat)
+
+    # move dispatch
+    results["do_turn_r"] = measure(lambda: hedgehog._do_turn(CW_R_TURN_CONFIG), number, repeat)
+    results["do_turn_f2"] = measure(lambda: hedgehog._do_turn(F2_TURN_CONFIG), number, repeat)
+    results["do_move_r"] = measure(lambda: hedgehog.do_move("R"), number, repeat)
+    results["do_move_y"] = measure(lambda: hedgehog.do_move("y"), number, repeat)
+    # a click only queues its move: the queue is emptied after each click, so every call measures the same work
+    scheduler = hedgehog.scheduler
+    for button_id in ("R", "y"):
+        click = _click_event(hedgehog, button_id)
+
+        def queue_click():
+            hedgehog._handle_mouse_click(click)
+            scheduler.clear()
+
+        results[f"queue_click_{button_id.lower()}"] = measure(queue_click, number, repeat)
+
+    def dispatch_queued_move():
+        # the scheduler starts a queued move only when the tiles are at rest
+        scheduler.submit(["R"])
+        hedgehog.animator.finish_tracks()
+        scheduler.update()
+
+    results["scheduler_dispatch_r"] = measure(dispatch_queued_move, number, repeat)
+
+    # animation and tile drawing, per frame (all the tiles)
+    animator, screen = hedgehog.animator, hedgehog.screen
+    for speed in SPEEDS:
+        animator.update_speed(speed)
+
+        def update_frame():
+            _keep_animating(hedgehog)
+            animator.update(1 / 60)
+
+        def draw_frame():
+            update_frame()
+            for tile in hedgehog.tiles:
+                tile.draw(screen)
+
+        results[f"tiles_update_speed_{speed}"] = measure(update_frame, number, repeat)
+        results[f"tiles_update_and_draw_speed_{speed}"] = measure(draw_frame, number, repeat)
+
+    # full frames, without the frame rate limit
+    for dirty_rect_rendering in (False, True):
+        hedgehog = Hedgehog2D(dirty_rect_rendering=dirty_rect_rendering)
+        hedgehog.fps = 0
+
+        def frame():
+            _keep_animating(hedgehog)
+            hedgehog.display()
+
+        name = "display_frame_dirty_rects" if dirty_rect_rendering else "display_frame"
+        results[name] = measure(frame, max(1, number // 10), repeat)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the 2D Hedgehog headlessly, and print the results as JSON.")
+    parser.add_argument("--number", type=int, default=1000, help="calls per round (a tenth of it for full frames)")
+    parser.add_argument("--repeat", type=int, default=5, help="rounds per benchmark; the fastest one is reported")
+    parser.add_argument("--output", default=None, help="write the JSON to this file instead of stdout")
+    args = parser.parse_args()
+
+    report = {
+        "python": platform.python_version(),
+        "pygame": pygame.version.ver,
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "number": args.number,
+        "repeat": args.repeat,
+        "results": run_benchmarks(args.number, args.repeat),
+    }
+    text = json.dumps(report, indent=2)
+    if args.output is None:
+        print(text)
+    else:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
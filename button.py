@@ -14,8 +14,17 @@ class Button:
         self.text_pos = (self.rect.x + text_pos[0], self.rect.y + text_pos[1])
         self.color = color
         self.is_active = is_active
+        # the button with its text is rendered only once for each state (active or inactive) and font
+        self._surfaces: dict[tuple[bool, pygame.font.Font], pygame.surface.Surface] = {}
+
+    def _render(self, font: pygame.font.Font) -> pygame.surface.Surface:
+        surface = pygame.Surface(self.rect.size)
+        surface.fill(self.color if self.is_active else GRAY_COLOR)
+        surface.blit(font.render(self.text, True, WHITE_COLOR), (self.text_pos[0] - self.rect.x, self.text_pos[1] - self.rect.y))
+        return surface
 
     def draw(self, screen: pygame.surface.Surface, font: pygame.font.Font):
-        color = self.color if self.is_active else GRAY_COLOR
-        pygame.draw.rect(screen, color, self.rect)
-        screen.blit(font.render(self.text, True, WHITE_COLOR), self.text_pos)
+        key = (self.is_active, font)
+        if key not in self._surfaces:
+            self._surfaces[key] = self._render(font)
+        screen.blit(self._surfaces[key], self.rect)
@@ -0,0 +1,145 @@
+# A differential fuzzer for the two representations of the puzzle: the 2D tile layout (moved by the *_TURN_CONFIG
+# definitions, through move_compiler.TILE_TRANSFORMS) and the 3D sticker model (permuted by the STICKER_PERMUTATION_*
+# definitions, through puzzle_state.MOVE_PERMUTATIONS). Random move sequences are applied to both, and after every move,
+# the tile layout is projected onto the stickers (see tile_projection.py) and compared with the sticker model.
+#
+# The sequences follow the rules of the buttons: after the first half of a split gyro move (ya), the next move is
+# always its second half (yb). Between the two halves, the tiles are rotated by 30 degrees compared to the stickers,
+# so the pending rotation of yb is added before the projection.
+#
+# The sequences are processed in batches (every move of a batch is a few numpy operations), on multiple processes.
+#
+# TILE_TRANSFORMS is only a model of the application, so a smaller number of sequences is also replayed through the real
+# one: a headless Hedgehog2D starts every move with start_move, the TileAnimator brings the tiles to rest, and the grid
+# positions and angles of the Tile objects and the colors of Model3D are compared with TILE_TRANSFORMS and MOVE_PERMUTATIONS.
+
+from puzzle_state import MOVE_IDS, MOVE_NAMES, MOVE_PERMUTATIONS, solved_states, to_colors
+from move_compiler import NUM_SLOTS, TILE_TRANSFORMS
+from tile_projection import project_faces, sticker_faces
+
+import argparse
+import math
+import multiprocessing
+import os
+import time
+import numpy as np
+
+# the dummy video driver renders to memory, without a window (for the replays through Hedgehog2D)
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+FUZZ_MOVES = MOVE_IDS + ("ya", "yb")
+_YA, _YB = FUZZ_MOVES.index("ya"), FUZZ_MOVES.index("yb")
+_PERMUTATIONS = np.stack([MOVE_PERMUTATIONS[move_id] for move_id in FUZZ_MOVES])
+_DESTINATIONS = np.stack([TILE_TRANSFORMS[move_id].destinations for move_id in FUZZ_MOVES])
+_ANGLE_DELTAS = np.stack([TILE_TRANSFORMS[move_id].angle_deltas for move_id in FUZZ_MOVES])
+
+
+def fuzz_batch(args: tuple[int, int, int]) -> tuple[int, list[str] | None]:
+    """Check a batch of random sequences. Return the number of checked sequences, and the first failing sequence (if any)."""
+    seed, batch_size, length = args
+    rng = np.random.default_rng(seed)
+    rows = np.arange(batch_size)[:, None]
+    states = solved_states(batch_size)
+    slots = np.tile(np.arange(NUM_SLOTS), (batch_size, 1))
+    angles = np.zeros((batch_size, NUM_SLOTS), dtype=np.int64)
+    is_split = np.zeros(batch_size, dtype=bool)
+    moves = np.empty((batch_size, length), dtype=np.uint8)
+
+    for step in range(length):
+        # any move but yb (the last one), or yb right after ya
+        move = np.where(is_split, _YB, rng.integers(0, _YB, batch_size))
+        moves[:, step] = move
+        states = states[rows, _PERMUTATIONS[move]]
+        angles = (angles + _ANGLE_DELTAS[move[:, None], slots]) % 360
+        slots = _DESTINATIONS[move[:, None], slots]
+        is_split ^= (move == _YA) | (move == _YB)
+
+        pending_angles = np.where(is_split[:, None], _ANGLE_DELTAS[_YB][slots], 0)
+        mismatches = np.any(project_faces(slots, angles + pending_angles) != sticker_faces(states), axis=1)
+        if mismatches.any():
+            failing = int(np.flatnonzero(mismatches)[0])
+            return batch_size, [FUZZ_MOVES[move] for move in moves[failing, :step + 1]]
+    return batch_size, None
+
+
+def fuzz_application(num_sequences: int, length: int, seed=0) -> list[str] | None:
+    """Replay random sequences through a headless Hedgehog2D, and check after every move that its tiles and its 3D model
+    agree with TILE_TRANSFORMS and MOVE_PERMUTATIONS. Return the first failing sequence, or None."""
+    # imported here, so that the worker processes of the batches do not load pygame
+    from hedgehog2d import Hedgehog2D
+
+    rng = np.random.default_rng(seed)
+    hedgehog = Hedgehog2D()
+    for _ in range(num_sequences):
+        hedgehog.start_move("Reset")
+        hedgehog.animator.finish_tracks()
+        state, slots, angles = solved_states()[0], np.arange(NUM_SLOTS), np.zeros(NUM_SLOTS, dtype=np.int64)
+        sequence = []
+        for _ in range(length):
+            move_id = "yb" if sequence and sequence[-1] == "ya" else FUZZ_MOVES[rng.integers(0, _YB)]
+            sequence.append(move_id)
+            hedgehog.start_move(move_id)
+            hedgehog.animator.finish_tracks()
+            state = state[MOVE_PERMUTATIONS[move_id]]
+            transform = TILE_TRANSFORMS[move_id]
+            angles = (angles + transform.angle_deltas[slots]) % 360
+            slots = transform.destinations[slots]
+
+            # tile i starts on slot i, so slots and angles are indexed by the tiles
+            tiles_agree = all(tile.grid_pos == divmod(int(slot), hedgehog.animator.cols)
+                              and tile.target_angle == angle
+                              and math.isclose(tile.current_angle, angle, abs_tol=1e-9)
+                              and not tile.is_animating()
+                              for tile, slot, angle in zip(hedgehog.tiles, slots, angles))
+            if not tiles_agree or hedgehog.model3d.sticker_colors != to_colors(state):
+                return sequence
+    return None
+
+
+def fuzz(num_sequences: int, length: int, batch_size: int, processes: int | None = None, seed=0, verbose=False) -> list[str] | None:
+    """Check num_sequences random sequences of the given length; return the first failing sequence, or None."""
+    num_batches = -(-num_sequences // batch_size)
+    tasks = [(seed * num_batches + batch, batch_size, length) for batch in range(num_batches)]
+    checked, start = 0, time.perf_counter()
+    with multiprocessing.Pool(processes) as pool:
+        for count, failure in pool.imap_unordered(fuzz_batch, tasks):
+            checked += count
+            if failure is not None:
+                pool.terminate()
+                return failure
+            if verbose:
+                elapsed = time.perf_counter() - start
+                print(f"{checked:>12,} sequences checked, {checked / elapsed * 60:,.0f} sequences per minute", flush=True)
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that the 2D tile layout and the 3D sticker model of the 2D Hedgehog "
+                                                 "always agree, on random move sequences.")
+    parser.add_argument("--sequences", type=int, default=1_000_000, help="number of random sequences")
+    parser.add_argument("--length", type=int, default=30, help="number of moves in a sequence")
+    parser.add_argument("--batch-size", type=int, default=20_000, help="number of sequences checked at once by a process")
+    parser.add_argument("--processes", type=int, default=None, help="number of worker processes (default: all CPUs)")
+    parser.add_argument("--application-sequences", type=int, default=1000,
+                        help="number of random sequences also replayed through a headless Hedgehog2D")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    failure = fuzz_application(args.application_sequences, args.length, args.seed)
+    if failure is not None:
+        print(f"The application disagrees with the move tables after the moves: "
+              f"{' '.join(MOVE_NAMES.get(move_id, move_id) for move_id in failure)}")
+        raise SystemExit(1)
+    print(f"{args.application_sequences:,} sequences replayed through the application agree with the move tables.", flush=True)
+
+    failure = fuzz(args.sequences, args.length, args.batch_size, args.processes, args.seed, verbose=True)
+    if failure is None:
+        print("The tile layout and the sticker model agree in every checked state.")
+    else:
+        print(f"Disagreement after the moves: {' '.join(MOVE_NAMES.get(move_id, move_id) for move_id in failure)}")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,8 +6,11 @@ ROWS, COLS = 2, 4  # hedgehog grid size
 
 TILE_POSITION_ADJUSTMENT = 65  # bring the tiles closer to the center by this amount in pixel
 
-TRANSLATION_TOLERANCE = 3  # tolerance in pixel for snapping tiles to their target positions
-ROTATION_TOLERANCE = 0.05  # tolerance in degrees for snapping tiles to their target angles
+ROTATION_CACHE_ANGLE_STEP = 5.0                  # rotated tile images are cached with this angle resolution in degrees
+ROTATION_CACHE_MEMORY_BUDGET = 48 * 1024 * 1024  # memory budget in bytes for the cached rotated images of all the tiles together
+
+TILE_ATLAS_PATH = "tile_images/atlas.bin"  # the pre-rotated tiles in raw RGBA, created by running tile_atlas.py
+TILE_ATLAS_SIZES = (85, 170, 255)          # the tile sizes in the atlas in pixel; the application picks TILE_SIZE, if present
 
 #############################################
 # MAIN WINDOW
@@ -18,6 +21,17 @@ WINDOW_HEIGHT = 700
 FPS = 60  # animation FPS
 BACKGROUND_COLOR = (68, 68, 68)
 SHADOW_OFFSET = 3  # shadow offset in pixels for texts and slider
+TEXT_CACHE_SIZE = 256  # the maximum number of rendered text surfaces to keep
+PROFILER_CAPACITY = 600  # the number of frames kept by the frame profiler (10 seconds at 60 FPS)
+PROFILER_OVERLAY_POS = (WINDOW_WIDTH - 270, 10)  # top-left corner of the frame time overlay
+MOVES_TO_SOLVE_TEXT_POS = (10, WINDOW_HEIGHT - 140)  # the position of the "moves to solve" text, left of the 3D model
+
+#############################################
+# GRID VIEW
+#############################################
+GRID_VIEW_WINDOW_SIZE = (1280, 960)  # the window of grid_view.py
+GRID_VIEW_COLUMNS = 8                # the number of puzzles in a row of the grid view
+GRID_VIEW_CONTENT_HEIGHT = 600       # the top part of the main window (the tiles and the 3D model) shown in a grid cell
 
 #############################################
 # SLIDER
@@ -26,6 +40,7 @@ SLIDER_X = 530
 SLIDER_Y = WINDOW_HEIGHT - 85
 SLIDER_WIDTH = 250
 SLIDER_TEXT_POS = (SLIDER_X + 80, SLIDER_Y - 50)
+SLIDER_AREA = (SLIDER_X - 15, SLIDER_TEXT_POS[1] - 5, SLIDER_WIDTH + 30, SLIDER_Y - SLIDER_TEXT_POS[1] + 25)  # the slider with its text
 
 #############################################
 # COLORS
@@ -48,13 +63,28 @@ L_SIDE_STICKER_COLOR = (255, 165, 0)    # orange
 B_SIDE_STICKER_COLOR = (0, 0, 255)      # blue
 D_SIDE_STICKER_COLOR = (255, 255, 0)    # yellow
 
+# For tiles: the colors of the three squares of each tile, row by row, and the tilt of the tile (a multiple of 30 degrees).
+# The square i points to the direction 45 + tilt + 120 * i degrees (clockwise on the screen, from the right).
+# The images in the tile_images folder are created from these by _create_tile_images.py
+TILE_CONFIGS = [(L_SIDE_STICKER_COLOR, B_SIDE_STICKER_COLOR, U_SIDE_STICKER_COLOR,   0),
+                (F_SIDE_STICKER_COLOR, L_SIDE_STICKER_COLOR, U_SIDE_STICKER_COLOR, -30),
+                (R_SIDE_STICKER_COLOR, F_SIDE_STICKER_COLOR, U_SIDE_STICKER_COLOR,   0),
+                (B_SIDE_STICKER_COLOR, R_SIDE_STICKER_COLOR, U_SIDE_STICKER_COLOR, -30),
+                (D_SIDE_STICKER_COLOR, B_SIDE_STICKER_COLOR, L_SIDE_STICKER_COLOR,  30),
+                (D_SIDE_STICKER_COLOR, L_SIDE_STICKER_COLOR, F_SIDE_STICKER_COLOR,  60),
+                (D_SIDE_STICKER_COLOR, F_SIDE_STICKER_COLOR, R_SIDE_STICKER_COLOR,  30),
+                (D_SIDE_STICKER_COLOR, R_SIDE_STICKER_COLOR, B_SIDE_STICKER_COLOR,  60)]
+
 #############################################
 # TURNING CONFIGURATIONS
 #############################################
-ROTATION_ANIM_SPEED = 1.0    # base speed for rotation animations
-SMOOTH_MOVEMENT_SPEED = 3.0  # base speed for smooth movement animations
+TURN_ANIMATION_DURATION = 1.0    # duration of the rotation around a pivot point in seconds, at speed multiplier 1
+SLIDE_ANIMATION_DURATION = 0.75  # duration of the other movements (and local rotations) in seconds, at speed multiplier 1
 SPEED_MIN_VALUE = 1.0/3.0    # minimum speed multiplier from the slider
 SPEED_MAX_VALUE = 3.0        # maximum speed multiplier from the slider
+MOVE_QUEUE_SKIP_THRESHOLD = 8        # if more moves are queued, the move scheduler skips ahead to the final state
+MOVE_SCHEDULER_FRAME_BUDGET = 0.004  # time in seconds the move scheduler may spend compiling skipped moves in a frame
+MOVE_SCHEDULER_CHUNK_SIZE = 64       # the number of skipped moves compiled at once
 
 # Pivot points are the centers of the 2x2 tile groups; one on the left, one on the right
 PIVOT_Y = 200
@@ -158,3 +188,14 @@ assert sorted(STICKER_PERMUTATION_D2) == list(range(24))
 assert sorted(STICKER_PERMUTATION_F2) == list(range(24))
 assert sorted(STICKER_PERMUTATION_B2) == list(range(24))
 assert sorted(STICKER_PERMUTATION_Y)  == list(range(24))
+
+#############################################
+# HEADLESS TOOLS
+#############################################
+DISTANCE_TABLE_PATH = "tables/distance_table.bin"  # the solver's distance table is built on first use and stored here
+SOLVE_SERVICE_CACHE_SIZE = 1_000_000  # the number of solutions kept by solve_service.py (about 200 bytes each)
+SOLVE_SERVICE_CHUNK_SIZE = 4096       # the number of states sent to a worker of solve_service.py at once
+STATE_CACHE_PATH = "tables/state_cache.bin"  # the persistent analysis cache of state_cache.py
+STATE_CACHE_MAX_ENTRIES = 1_000_000          # the number of cached states kept in memory (about 150 bytes each)
+STATE_CACHE_MAX_FILE_SIZE = 64 * 1024 * 1024  # the file of the cache is compacted when it grows larger (in bytes)
+SESSION_CHECKPOINT_INTERVAL = 256  # a session replay stores the state after every this many moves
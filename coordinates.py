@@ -0,0 +1,171 @@
+from constants import STICKER_COLORS
+from puzzle_state import NUM_STICKERS, STATE_DTYPE, MOVE_IDS, apply_move
+
+import math
+import numpy as np
+
+# Every state of the 2x2x2 puzzle (including the whole-cube orientation, as x and y are moves on the Hedgehog) is described
+# by the permutation of the 8 corner pieces and the twist of the first 7 corners; the twist of the last one follows from them.
+# These are encoded as two dense integers, and the pair of them as a single state index in the range [0, NUM_STATES).
+
+# The corner positions as triples of sticker positions. The first sticker is always the U or D sticker of the corner,
+# followed by the other two in clockwise order. The corners are numbered by their U and D stickers (Ulb, Ubr, Urf, Ufl, Dlf, Dfr, Drb, Dbl).
+CORNERS = ((0, 12, 17), (1, 16, 9), (2, 8, 5), (3, 4, 13), (20, 14, 7), (21, 6, 11), (22, 10, 19), (23, 18, 15))
+NUM_CORNERS = 8
+
+NUM_PERMUTATIONS = math.factorial(NUM_CORNERS)  # 40320
+NUM_TWISTS = 3 ** (NUM_CORNERS - 1)             # 2187
+NUM_STATES = NUM_PERMUTATIONS * NUM_TWISTS      # 88179840; the solved state has index 0
+INDEX_DTYPE = np.uint32
+
+_CORNER_STICKERS = np.array(CORNERS, dtype=np.intp)  # (8, 3)
+# for every sticker: the corner piece it belongs to, and its slot within the corner triple
+_STICKER_CORNER = np.empty(NUM_STICKERS, dtype=np.intp)
+_STICKER_SLOT = np.empty(NUM_STICKERS, dtype=np.intp)
+for _corner, _stickers in enumerate(CORNERS):
+    _STICKER_CORNER[list(_stickers)] = _corner
+    _STICKER_SLOT[list(_stickers)] = range(3)
+
+_TWIST_WEIGHTS = np.array([3 ** (NUM_CORNERS - 2 - i) for i in range(NUM_CORNERS - 1)], dtype=np.int64)
+
+
+def corners_from_states(states: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Return the corner permutation (which piece is at each position) and the twist of each position (which slot of the
+    position holds the U/D sticker of the piece) for a batch of states."""
+    states = np.atleast_2d(states)
+    # the U/D sticker of the piece can be in any of the three slots; find which one holds a slot-0 sticker
+    corner_stickers = states[:, _CORNER_STICKERS]  # (N, 8, 3)
+    twists = np.argmin(_STICKER_SLOT[corner_stickers], axis=2)
+    pieces = _STICKER_CORNER[corner_stickers[:, :, 0]]
+    return pieces, twists
+
+
+def states_from_corners(pieces: np.ndarray, twists: np.ndarray) -> np.ndarray:
+    """The inverse of corners_from_states."""
+    n = pieces.shape[0]
+    states = np.empty((n, NUM_STICKERS), dtype=STATE_DTYPE)
+    for slot in range(3):
+        # the sticker at slot (twist + j) of a position is the sticker j of the piece
+        piece_slot = (slot - twists) % 3
+        states[:, _CORNER_STICKERS[:, slot]] = _CORNER_STICKERS[pieces, piece_slot]
+    return states
+
+
+# the face of each color, and the corner piece of each set of three faces (as a bit mask of the faces)
+_FACE_OF_COLOR = {color: sticker // 4 for sticker, color in enumerate(STICKER_COLORS)}
+_CORNER_OF_FACE_MASK = np.full(1 << (NUM_STICKERS // 4), -1, dtype=np.intp)
+for _corner, _stickers in enumerate(CORNERS):
+    _CORNER_OF_FACE_MASK[sum(1 << (sticker // 4) for sticker in _stickers)] = _corner
+
+
+def states_from_colors(colors) -> np.ndarray:
+    """Convert a batch of sticker color lists (like Model3D.sticker_colors, 24 RGB colors each) into sticker states.
+    Raise ValueError if a color list is not a reachable state of the puzzle."""
+    try:
+        faces = np.array([[_FACE_OF_COLOR[tuple(color)] for color in sticker_colors] for sticker_colors in colors], dtype=np.intp)
+    except (KeyError, TypeError):
+        raise ValueError("Unknown sticker color") from None
+    if faces.ndim != 2 or faces.shape[1] != NUM_STICKERS:
+        raise ValueError(f"A state needs {NUM_STICKERS} sticker colors")
+    corner_faces = faces[:, _CORNER_STICKERS]  # (N, 8, 3)
+    pieces = _CORNER_OF_FACE_MASK[np.sum(1 << corner_faces, axis=2)]
+    # the U and D faces are the first and the last ones
+    twists = np.argmax((corner_faces == 0) | (corner_faces == NUM_STICKERS // 4 - 1), axis=2)
+    states = states_from_corners(np.maximum(pieces, 0), twists)
+    # a state is valid if it gives back the same colors, every piece is used once, and the total twist is right
+    is_valid = np.all(pieces >= 0, axis=1) & np.all(np.sort(pieces, axis=1) == np.arange(NUM_CORNERS), axis=1) \
+        & np.all(states // 4 == faces, axis=1) & (np.sum(twists, axis=1) % 3 == 0)
+    if not is_valid.all():
+        raise ValueError(f"Invalid sticker colors in state {int(np.flatnonzero(~is_valid)[0])}")
+    return states
+
+
+def _myrvold_ruskey_unrank(ranks: np.ndarray) -> np.ndarray:
+    """Linear time unranking of Myrvold and Ruskey: undo the swaps of _myrvold_ruskey_rank, from the smallest prefix."""
+    ranks = np.array(ranks, dtype=np.int64)
+    n = ranks.shape[0]
+    rows = np.arange(n)
+    pieces = np.tile(np.arange(NUM_CORNERS), (n, 1))
+    for size in range(NUM_CORNERS, 1, -1):
+        ranks, digits = np.divmod(ranks, size)
+        last = pieces[:, size - 1].copy()
+        pieces[:, size - 1] = pieces[rows, digits]
+        pieces[rows, digits] = last
+    return pieces
+
+
+def _myrvold_ruskey_rank(pieces: np.ndarray) -> np.ndarray:
+    """Linear time ranking of Myrvold and Ruskey: repeatedly swap the last element of the prefix to its place,
+    and use the swapped value as the next mixed radix digit."""
+    n = pieces.shape[0]
+    rows = np.arange(n)
+    pieces = np.array(pieces, dtype=np.int64)
+    inverse = np.empty_like(pieces)
+    inverse[rows[:, None], pieces] = np.arange(NUM_CORNERS)
+    ranks = np.zeros(n, dtype=np.int64)
+    multiplier = 1
+    for size in range(NUM_CORNERS, 1, -1):
+        digits = pieces[:, size - 1]
+        positions = inverse[:, size - 1]
+        # move `size - 1` to the end of the prefix; only the first size - 1 entries are used afterwards
+        pieces[rows, positions] = digits
+        inverse[rows, digits] = positions
+        ranks += digits * multiplier
+        multiplier *= size
+    return ranks
+
+
+# The Myrvold-Ruskey rank of the identity is not 0, so the permutations are composed with the one of rank 0 first.
+# This keeps the solved state at index 0.
+_RANK_ZERO_PERMUTATION = _myrvold_ruskey_unrank(np.zeros(1, dtype=np.int64))[0]
+_RANK_ZERO_INVERSE = np.argsort(_RANK_ZERO_PERMUTATION)
+
+
+def rank_permutations(pieces: np.ndarray) -> np.ndarray:
+    """O(n) rank of a batch of corner permutations, in the range [0, 8!)."""
+    return _myrvold_ruskey_rank(pieces[:, _RANK_ZERO_PERMUTATION])
+
+
+def unrank_permutations(ranks: np.ndarray) -> np.ndarray:
+    return _myrvold_ruskey_unrank(ranks)[:, _RANK_ZERO_INVERSE]
+
+
+def rank_twists(twists: np.ndarray) -> np.ndarray:
+    """Base-3 rank of the twists of the first 7 corners, in the range [0, 3^7)."""
+    return twists[:, :NUM_CORNERS - 1] @ _TWIST_WEIGHTS
+
+
+def unrank_twists(ranks: np.ndarray) -> np.ndarray:
+    ranks = np.asarray(ranks, dtype=np.int64)
+    twists = np.empty((ranks.shape[0], NUM_CORNERS), dtype=np.int64)
+    for i in range(NUM_CORNERS - 1):
+        twists[:, i], ranks = np.divmod(ranks, _TWIST_WEIGHTS[i])
+    # the total twist of a valid state is always divisible by 3
+    twists[:, -1] = -np.sum(twists[:, :-1], axis=1) % 3
+    return twists
+
+
+def state_indices(states: np.ndarray) -> np.ndarray:
+    """Encode a batch of sticker states as state indices. The encoding is a bijection between the valid states and
+    [0, NUM_STATES), and the indices fit into 4 bytes, so they are cheap to store, hash and index with."""
+    pieces, twists = corners_from_states(states)
+    return (rank_permutations(pieces) * NUM_TWISTS + rank_twists(twists)).astype(INDEX_DTYPE)
+
+
+def states_from_indices(indices: np.ndarray) -> np.ndarray:
+    """Decode a batch of state indices into sticker states."""
+    permutation_ranks, twist_ranks = np.divmod(np.asarray(indices, dtype=np.int64), NUM_TWISTS)
+    return states_from_corners(unrank_permutations(permutation_ranks), unrank_twists(twist_ranks))
+
+
+def build_move_tables() -> tuple[np.ndarray, np.ndarray]:
+    """Build the coordinate move tables: entry [c, m] is the coordinate after applying MOVE_IDS[m] to coordinate c.
+    A move changes the permutation and the twist coordinates independently, so two small tables cover every state."""
+    permutation_table = np.empty((NUM_PERMUTATIONS, len(MOVE_IDS)), dtype=np.uint16)
+    twist_table = np.empty((NUM_TWISTS, len(MOVE_IDS)), dtype=np.uint16)
+    untwisted_states = states_from_indices(np.arange(NUM_PERMUTATIONS) * NUM_TWISTS)
+    unpermuted_states = states_from_indices(np.arange(NUM_TWISTS))
+    for m, move_id in enumerate(MOVE_IDS):
+        permutation_table[:, m] = state_indices(apply_move(untwisted_states, move_id)) // NUM_TWISTS
+        twist_table[:, m] = state_indices(apply_move(unpermuted_states, move_id)) % NUM_TWISTS
+    return permutation_table, twist_table
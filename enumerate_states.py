@@ -0,0 +1,103 @@
+# Enumerate every state reachable from the solved layout with the Hedgehog moves (x, x', L, L', R, R', U2, D2, F2, B2, y, y'),
+# and print how many states there are at each distance (the "God's number" table of this move set).
+#
+# The search is a breadth-first search on the state indices of coordinates.py. The visited states are kept in a bitset
+# (one bit per state, about 11 MB) in shared memory, and the frontier expansion is split across a process pool.
+
+from puzzle_state import MOVE_IDS
+from coordinates import NUM_STATES, NUM_TWISTS, build_move_tables
+
+import argparse
+import multiprocessing
+import os
+import time
+import numpy as np
+from multiprocessing import shared_memory
+
+MIN_CHUNK_SIZE = 1 << 16  # the smallest number of frontier states sent to a worker at once
+
+# per-worker globals, set by _init_worker
+_permutation_table = None
+_twist_table = None
+_visited = None
+_visited_memory = None
+
+
+def _init_worker(visited_name: str):
+    global _permutation_table, _twist_table, _visited, _visited_memory
+    permutation_table, _twist_table = build_move_tables()
+    _permutation_table = permutation_table.astype(np.int64) * NUM_TWISTS
+    _visited_memory = shared_memory.SharedMemory(name=visited_name)
+    _visited = np.ndarray(NUM_STATES // 8, dtype=np.uint8, buffer=_visited_memory.buf)
+
+
+def _is_visited(visited: np.ndarray, indices: np.ndarray) -> np.ndarray:
+    return ((visited[indices >> 3] >> (indices & 7).astype(np.uint8)) & 1).astype(bool)
+
+
+def _expand(frontier: np.ndarray) -> np.ndarray:
+    """Return the unvisited neighbors of a frontier chunk as sorted, unique state indices. The shared bitset is only
+    read here; it is updated by the main process between two levels of the search."""
+    permutations, twists = np.divmod(frontier.astype(np.int64), NUM_TWISTS)
+    neighbors = (_permutation_table[permutations] + _twist_table[twists]).reshape(-1)
+    return np.unique(neighbors[~_is_visited(_visited, neighbors)]).astype(np.uint32)
+
+
+def _mark_visited(visited: np.ndarray, indices: np.ndarray):
+    """Set the bits of sorted, unique state indices; the bits of the same byte are combined first."""
+    byte_indices = indices >> 3
+    starts = np.flatnonzero(np.diff(byte_indices, prepend=-1))
+    bits = np.left_shift(1, indices & 7).astype(np.uint8)
+    visited[byte_indices[starts]] |= np.bitwise_or.reduceat(bits, starts)
+
+
+def enumerate_states(processes: int | None = None, verbose: bool = False) -> list[int]:
+    """Run the search and return the number of states at each distance from the solved state."""
+    processes = processes or os.cpu_count()
+    visited_memory = shared_memory.SharedMemory(create=True, size=NUM_STATES // 8)
+    try:
+        visited = np.ndarray(NUM_STATES // 8, dtype=np.uint8, buffer=visited_memory.buf)
+        visited[:] = 0
+        visited[0] = 1  # the solved state has index 0
+        frontier = np.zeros(1, dtype=np.uint32)
+        counts = []
+        with multiprocessing.Pool(processes, initializer=_init_worker, initargs=(visited_memory.name,)) as pool:
+            while frontier.size > 0:
+                counts.append(frontier.size)
+                if verbose:
+                    print(f"depth {len(counts) - 1}: {frontier.size} states")
+                # a few chunks per worker keep the pool busy, while limiting the number of index arrays to merge
+                chunk_size = max(MIN_CHUNK_SIZE, -(-frontier.size // (4 * processes)))
+                chunks = [frontier[i:i + chunk_size] for i in range(0, frontier.size, chunk_size)]
+                # different chunks can reach the same state; np.unique removes the duplicates
+                frontier = np.unique(np.concatenate(list(pool.imap_unordered(_expand, chunks))))
+                if frontier.size > 0:
+                    _mark_visited(visited, frontier)
+        del visited
+        return counts
+    finally:
+        visited_memory.close()
+        visited_memory.unlink()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Count the states of the 2D Hedgehog at each distance from the solved state.")
+    parser.add_argument("--processes", type=int, default=os.cpu_count(), help="number of worker processes")
+    parser.add_argument("--verbose", action="store_true", help="print the size of each level while searching")
+    args = parser.parse_args()
+
+    start_time = time.perf_counter()
+    counts = enumerate_states(args.processes, args.verbose)
+    elapsed = time.perf_counter() - start_time
+
+    print(f"Moves: {' '.join(MOVE_IDS)}")
+    print(f"{'depth':>5} {'states':>12} {'total':>12}")
+    total = 0
+    for depth, count in enumerate(counts):
+        total += count
+        print(f"{depth:>5} {count:>12} {total:>12}")
+    print(f"God's number: {len(counts) - 1}, {total} states in {elapsed:.1f} seconds")
+
+
+if __name__ == "__main__":
+    main()
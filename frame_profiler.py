@@ -0,0 +1,106 @@
+from constants import PROFILER_CAPACITY, PROFILER_OVERLAY_POS, WHITE_COLOR, DARK_GRAY_COLOR
+
+import json
+import time
+import numpy as np
+import pygame
+
+# The phases of a frame of Hedgehog2D.display, in order; a frame is measured from the end of the frame rate limiting
+# (or the idle waiting), so the total is the work done in the frame
+PHASES = ("events", "update", "tiles", "buttons", "model", "slider", "texts", "overlay", "display")
+# Besides the phases and the total, the input latency of a frame is recorded: the time from the arrival of the oldest
+# input (a click on a button, a paste or a slider move) shown by the frame, until the frame is on the screen; it is NaN
+# if the frame shows no input. A queued move is shown by the frame that starts it (see move_scheduler.py).
+
+
+class FrameProfiler:
+    """Lightweight instrumentation of the main loop: the duration of each phase of the last frames is stored in
+    a fixed-size ring buffer (in milliseconds), so recording a frame does not allocate anything.
+    Optionally, an overlay shows the p50/p99 frame times, and the buffer is saved to a CSV or JSON file on exit."""
+    def __init__(self, capacity=PROFILER_CAPACITY, show_overlay=False, dump_path: str | None = None):
+        self.capacity = capacity
+        self.show_overlay = show_overlay
+        self.dump_path = dump_path
+        self.columns = PHASES + ("total", "input_latency")
+        self._column_of = {phase: i for i, phase in enumerate(self.columns)}
+        self.times = np.zeros((capacity, len(self.columns)))
+        self.num_frames = 0  # the number of frames measured so far; the last min(num_frames, capacity) are kept
+        self._frame_start = self._last_mark = 0.0
+        self._current = np.zeros(len(self.columns))  # the frame being measured; it is copied to the buffer when it ends
+        self._input_time: float | None = None  # the arrival time of the oldest input shown by the current frame
+        self._font = None
+
+    def begin_frame(self):
+        self._current[:] = 0.0
+        self._frame_start = self._last_mark = time.perf_counter()
+
+    def mark(self, phase: str):
+        """Record the time since the previous mark (or the beginning of the frame) as the duration of the phase."""
+        now = time.perf_counter()
+        self._current[self._column_of[phase]] += (now - self._last_mark) * 1000.0
+        self._last_mark = now
+
+    def input_shown(self, input_time: float):
+        """The current frame shows an input that arrived at input_time (a time.perf_counter value)."""
+        if self._input_time is None or input_time < self._input_time:
+            self._input_time = input_time
+
+    def end_frame(self):
+        """Finish the frame; it is on the screen now, with the inputs it shows."""
+        now = time.perf_counter()
+        self._current[self._column_of["total"]] = (now - self._frame_start) * 1000.0
+        if self._input_time is None:
+            self._current[self._column_of["input_latency"]] = np.nan
+        else:
+            self._current[self._column_of["input_latency"]] = (now - self._input_time) * 1000.0
+            self._input_time = None
+        self.times[self.num_frames % self.capacity] = self._current
+        self.num_frames += 1
+
+    def recorded_times(self) -> np.ndarray:
+        """The measured frames in chronological order, as rows of phase durations (and the total) in milliseconds."""
+        if self.num_frames <= self.capacity:
+            return self.times[:self.num_frames]
+        return np.roll(self.times, -(self.num_frames % self.capacity), axis=0)
+
+    def percentiles(self, column="total") -> tuple[float, float]:
+        """The p50 and p99 values of a column (by default, the frame times) in milliseconds; the NaN values are ignored."""
+        values = self.recorded_times()[:, self._column_of[column]]
+        values = values[~np.isnan(values)]
+        if values.size == 0:
+            return 0.0, 0.0
+        p50, p99 = np.percentile(values, [50, 99])
+        return float(p50), float(p99)
+
+    def overlay_rect(self) -> pygame.Rect:
+        return pygame.Rect(PROFILER_OVERLAY_POS, (260, 62))
+
+    def draw_overlay(self, screen: pygame.surface.Surface):
+        """Draw the frame time statistics on an opaque background, so the overlay can be drawn over the previous one."""
+        if self._font is None:
+            self._font = pygame.font.Font(None, 22)
+        rect = self.overlay_rect()
+        p50, p99 = self.percentiles()
+        latency_p50, latency_p99 = self.percentiles("input_latency")
+        # the slowest phase of the last frame
+        last = self.times[(self.num_frames - 1) % self.capacity, :len(PHASES)]
+        slowest = int(np.argmax(last))
+        screen.fill(DARK_GRAY_COLOR, rect)
+        lines = (f"frame p50 {p50:.2f} ms  p99 {p99:.2f} ms", f"slowest: {self.columns[slowest]} {last[slowest]:.2f} ms",
+                 f"input p50 {latency_p50:.2f} ms  p99 {latency_p99:.2f} ms")
+        for i, line in enumerate(lines):
+            screen.blit(self._font.render(line, True, WHITE_COLOR), (rect.x + 6, rect.y + 5 + i * 18))
+
+    def dump(self, path: str | None = None):
+        """Save the recorded frames to a CSV or JSON file, depending on the extension of the path."""
+        path = path or self.dump_path
+        if path is None:
+            return
+        times = self.recorded_times()
+        if path.endswith(".json"):
+            with open(path, "w") as f:
+                # JSON has no NaN, so the frames without input latency get null
+                frames = [[None if np.isnan(value) else value for value in row] for row in times.round(4).tolist()]
+                json.dump({"unit": "ms", "columns": list(self.columns), "frames": frames}, f)
+        else:
+            np.savetxt(path, times, fmt="%.4f", delimiter=",", header=",".join(self.columns), comments="")
@@ -0,0 +1,170 @@
+from constants import WINDOW_WIDTH, TILE_SIZE, ROWS, COLS, FPS, BACKGROUND_COLOR, WHITE_COLOR, LIGHT_GRAY_COLOR
+from constants import MODEL_STICKER_TARGET_SIZE, MODEL_3D_TOP_MARGIN, TILE_ATLAS_PATH
+from constants import GRID_VIEW_WINDOW_SIZE, GRID_VIEW_COLUMNS, GRID_VIEW_CONTENT_HEIGHT
+
+from tile_animation import grid_pixel_positions
+from tile_atlas import load_tile_atlas
+from tile_projection import tile_layouts
+from sprite_cache import RotationCache, MemoryBudget
+from text_cache import TextCache
+from model3d import Model3D
+from puzzle_state import MOVE_NAMES, solved_states, apply_move, to_colors
+from move_compiler import parse_moves
+from scramble import random_states
+
+import argparse
+import numpy as np
+import pygame
+
+# A view of many puzzle states at once, in a scrollable grid: every cell shows the tiles and the 3D model of a state,
+# scaled down from the main window. The states are static, so the blits of the visible cells are collected only when
+# the view scrolls, and every frame draws all of them with a single batched blit call. The rotated tile images are
+# shared by all the cells (they only differ in the 30 degree step of the rotation).
+
+
+class GridView:
+    """Show a batch of puzzle_state.py states in a grid, with an optional label for each of them."""
+    def __init__(self, states: np.ndarray, labels: list[str] | None = None, columns=GRID_VIEW_COLUMNS):
+        pygame.display.init()
+        pygame.font.init()
+        pygame.display.set_caption("2D Hedgehog - grid view")
+        self.screen = pygame.display.set_mode(GRID_VIEW_WINDOW_SIZE)
+        self.clock = pygame.time.Clock()
+        self.fps = FPS
+        self.font = pygame.font.Font(None, 20)
+        self.text_cache = TextCache()
+
+        self.states = np.atleast_2d(states)
+        self.labels = labels if labels is not None else [str(i) for i in range(len(self.states))]
+        self.slots, self.angles = tile_layouts(self.states)
+        self.columns = columns
+        self.scale = GRID_VIEW_WINDOW_SIZE[0] / columns / WINDOW_WIDTH
+        self.cell_size = (round(WINDOW_WIDTH * self.scale), round(GRID_VIEW_CONTENT_HEIGHT * self.scale))
+        # the last visible row can be partially visible
+        self.visible_rows = -(-GRID_VIEW_WINDOW_SIZE[1] // self.cell_size[1])
+        self.full_rows = GRID_VIEW_WINDOW_SIZE[1] // self.cell_size[1]
+        self.first_row = 0
+
+        self.tile_size = round(TILE_SIZE * self.scale)
+        self.slot_offsets = grid_pixel_positions(ROWS, COLS) * self.scale
+        self.tile_caches = self._load_tile_caches()
+        model_size = (round(MODEL_STICKER_TARGET_SIZE[0] * self.scale), round(MODEL_STICKER_TARGET_SIZE[1] * self.scale))
+        self.model3d = Model3D(size=model_size, center_x=self.cell_size[0] // 2, top=round(MODEL_3D_TOP_MARGIN * self.scale))
+        self._blit_sequence: list[tuple[pygame.surface.Surface, tuple[int, int]]] | None = None
+
+    def _load_tile_caches(self) -> list[RotationCache]:
+        """One rotation cache per tile, at the size of the cells, with every 30 degree step rendered in advance."""
+        atlas = load_tile_atlas(TILE_ATLAS_PATH, self.tile_size)
+        budget = MemoryBudget()
+        if atlas is None:
+            images = [pygame.transform.smoothscale(pygame.image.load(f"tile_images/{i+1}.png").convert_alpha(),
+                                                   (self.tile_size, self.tile_size)) for i in range(8)]
+            caches = [RotationCache(image, budget=budget) for image in images]
+            for cache in caches:
+                cache.prerender(range(0, 360, 30))
+        else:
+            images, rotations = atlas
+            caches = [RotationCache(image, budget=budget) for image in images]
+            for cache, frames in zip(caches, rotations):
+                for angle, surface in frames.items():
+                    cache.put(angle, surface)
+        return caches
+
+    @property
+    def num_rows(self) -> int:
+        return -(-len(self.states) // self.columns)
+
+    def cell_origin(self, index: int) -> tuple[int, int]:
+        row, col = divmod(index, self.columns)
+        return col * self.cell_size[0], (row - self.first_row) * self.cell_size[1]
+
+    def cell_at(self, pos: tuple[int, int]) -> int | None:
+        """The index of the state shown at the given screen position, if any."""
+        index = (pos[1] // self.cell_size[1] + self.first_row) * self.columns + pos[0] // self.cell_size[0]
+        return index if pos[0] < self.columns * self.cell_size[0] and index < len(self.states) else None
+
+    def scroll(self, rows: int):
+        first_row = min(max(self.first_row + rows, 0), max(self.num_rows - self.full_rows, 0))
+        if first_row != self.first_row:
+            self.first_row = first_row
+            self._blit_sequence = None
+
+    def _build_blit_sequence(self) -> list[tuple[pygame.surface.Surface, tuple[int, int]]]:
+        """The blits of the visible cells: the 3D model thumbnails, the tiles and the labels."""
+        sequence = []
+        first = self.first_row * self.columns
+        for index in range(first, min(first + self.visible_rows * self.columns, len(self.states))):
+            x, y = self.cell_origin(index)
+            self.model3d.sticker_colors = to_colors(self.states[index])
+            # the model surface is redrawn for the next cell, so the thumbnail is a copy
+            sequence.append((self.model3d.get_surface().copy(), (x + self.model3d.rect.x, y + self.model3d.rect.y)))
+            for tile, cache in enumerate(self.tile_caches):
+                surface = cache.get(self.angles[index, tile])
+                center = self.slot_offsets[self.slots[index, tile]]
+                sequence.append((surface, (round(x + center[0] - surface.get_width() / 2),
+                                           round(y + center[1] - surface.get_height() / 2))))
+            sequence.append((self.text_cache.render(self.font, self.labels[index], WHITE_COLOR), (x + 4, y + 4)))
+        return sequence
+
+    def render(self):
+        if self._blit_sequence is None:
+            self._blit_sequence = self._build_blit_sequence()
+        self.screen.fill(BACKGROUND_COLOR)
+        # pygame-ce has the faster fblits; pygame has blits, which does the same without returning the rectangles
+        if hasattr(self.screen, "fblits"):
+            self.screen.fblits(self._blit_sequence)
+        else:
+            self.screen.blits(self._blit_sequence, doreturn=False)
+        hovered = self.cell_at(pygame.mouse.get_pos()) if pygame.mouse.get_focused() else None
+        if hovered is not None:
+            pygame.draw.rect(self.screen, LIGHT_GRAY_COLOR, pygame.Rect(self.cell_origin(hovered), self.cell_size), 1)
+
+    def display(self) -> bool:
+        """Handle the events and show a frame. Returns false if the view should be closed."""
+        self.clock.tick(self.fps)
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                pygame.quit()
+                return False
+            elif event.type == pygame.MOUSEWHEEL:
+                self.scroll(-event.y)
+            elif event.type == pygame.KEYDOWN:
+                page = self.full_rows
+                rows = {pygame.K_DOWN: 1, pygame.K_UP: -1, pygame.K_PAGEDOWN: page, pygame.K_PAGEUP: -page,
+                        pygame.K_HOME: -self.num_rows, pygame.K_END: self.num_rows}.get(event.key, 0)
+                self.scroll(rows)
+        self.render()
+        pygame.display.update()
+        return True
+
+
+def path_states(move_ids: list[str], start: np.ndarray | None = None) -> np.ndarray:
+    """The states along a move sequence: the start state (the solved one by default), and the state after every move."""
+    states = [solved_states()[0] if start is None else start]
+    for move_id in move_ids:
+        states.append(apply_move(states[-1], move_id))
+    return np.stack(states)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show many states of the 2D Hedgehog at once, in a grid.")
+    parser.add_argument("moves", nargs="?", default=None, help="show every state along this move sequence, like \"R U2 x'\"")
+    parser.add_argument("--random", type=int, default=64, help="otherwise, show this many uniformly random states")
+    parser.add_argument("--seed", type=int, default=None, help="random seed of the states")
+    parser.add_argument("--columns", type=int, default=GRID_VIEW_COLUMNS, help="number of puzzles in a row")
+    args = parser.parse_args()
+
+    if args.moves is not None:
+        move_ids = parse_moves(args.moves)
+        states = path_states(move_ids)
+        labels = ["start"] + [f"{i + 1}: {MOVE_NAMES.get(move_id, move_id)}" for i, move_id in enumerate(move_ids)]
+    else:
+        states = random_states(args.random, np.random.default_rng(args.seed))
+        labels = None
+    view = GridView(states, labels, args.columns)
+    while view.display():
+        pass
+
+
+if __name__ == "__main__":
+    main()
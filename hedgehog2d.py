@@ -1,31 +1,124 @@
 from constants import *
 
 from tile import Tile
+from sprite_cache import MemoryBudget
+from tile_animation import TileAnimator
+from tile_atlas import load_tile_atlas
 from button import Button
 from slider import Slider
 from model3d import Model3D
+from move_compiler import MoveMacro, parse_moves
+from move_scheduler import MoveScheduler
+from text_cache import TextCache
+from frame_profiler import FrameProfiler
+from session_log import SessionLog
+from state_cache import StateCache
 
+import threading
+import time
 import pygame
 
+SOLVER_LOADED_EVENT = pygame.event.custom_type()  # posted by the thread loading the solver of the state cache
+
 class Hedgehog2D:
-    """Main class to run the Hedgehog 2D application. Handles initialization, main loop, event handling, and rendering."""
-    def __init__(self):
-        pygame.init()
+    """Main class to run the Hedgehog 2D application. Handles initialization, main loop, event handling, and rendering.
+
+    In dirty rectangle rendering mode, only the changed areas of the screen are redrawn and updated,
+    and when nothing moves, the main loop blocks until the next event instead of redrawing the same frame.
+    With a profiler, the duration of each phase of the frames is measured (see frame_profiler.py).
+    With a session log, the moves are recorded, so the session can be replayed later (see session_log.py).
+    The clicked (or pasted) moves are played one after the other by a move scheduler (see move_scheduler.py).
+    With a state cache, the number of moves to solve the current state is shown (see state_cache.py).
+    """
+    def __init__(self, dirty_rect_rendering=False, profiler: FrameProfiler | None = None, fast_startup=False, report_startup=False,
+                 session_log: SessionLog | None = None, state_cache: StateCache | None = None):
+        self.startup_times: dict[str, float] = {}  # the duration of the startup phases in milliseconds
+        self.report_startup = report_startup
+        self._startup_mark = time.perf_counter()
+
+        if fast_startup:
+            # only the modules needed to paint a frame; audio, joysticks etc. are not initialized
+            pygame.display.init()
+            pygame.font.init()
+        else:
+            pygame.init()
+        self._mark_startup("pygame init")
         pygame.display.set_caption("2D Hedgehog")
 
         self.screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
+        try:
+            pygame.scrap.init()  # the clipboard, for pasting moves
+        except pygame.error:
+            pass
         self.clock = pygame.time.Clock()
-        self.font = pygame.font.SysFont(None, 36)
+        self.fps = FPS  # the frame rate limit; 0 means no limit
+        self._mark_startup("display")
+        # the default font of pygame is bundled with pygame, so it needs no system font lookup
+        self.font = pygame.font.Font(None, 36) if fast_startup else pygame.font.SysFont(None, 36)
+        self.text_cache = TextCache()
+        self._mark_startup("font")
 
         self.model3d = Model3D()
         self.slider = Slider(SLIDER_X, SLIDER_Y, SLIDER_WIDTH, min_val=1, max_val=100, start_val=50)
+        # the animation state of every tile lives in the animator
+        self.animator = TileAnimator(ROWS, COLS)
+        self.animator.update_speed(self.slider.value)
+        self.scheduler = MoveScheduler(self)
+        self._init_buttons()
+        self._mark_startup("widgets")
 
-        # load the tile images, rescale, and build the 2x4 grid
-        tile_images = [pygame.image.load(f"tile_images/{i+1}.png").convert_alpha() for i in range(8)]
-        tile_images = [pygame.transform.scale(img, (TILE_SIZE, TILE_SIZE)) for img in tile_images]
-        self.tiles = [Tile(tile_images[i], (i // COLS, i % COLS), self.slider.value) for i in range(8)]
+        self.dirty_rect_rendering = dirty_rect_rendering
+        self._dirty_rects: list[pygame.Rect] = [self.screen.get_rect()]  # the areas to redraw in the next frame
+        self.profiler = profiler
+        self._last_poll = time.perf_counter()  # the last time the event queue was polled (see _handle_events)
+        self.session_log = session_log  # the moves of the clicks are appended to the log
+        self.state_cache = state_cache
+        self._analyzed_colors, self._moves_to_solve = None, None  # the last analyzed state of the 3D model
+        if state_cache is not None and not state_cache.is_solver_loaded():
+            # building the solver tables takes up to a minute on the first run, so the window must not wait for it
+            threading.Thread(target=self._load_solver, daemon=True).start()
 
-        self._init_buttons()
+        # in fast startup mode, the tiles are loaded after the first frame is shown
+        self.tiles: list[Tile] = []
+        if not fast_startup:
+            self._load_tiles()
+
+    def _load_solver(self):
+        self.state_cache.load_solver()
+        try:
+            # the event wakes up the main loop, even if it is blocked waiting for events in dirty rectangle rendering mode
+            pygame.event.post(pygame.event.Event(SOLVER_LOADED_EVENT))
+        except pygame.error:
+            pass  # the application has quit in the meantime
+
+    def _mark_startup(self, phase: str):
+        now = time.perf_counter()
+        self.startup_times[phase] = (now - self._startup_mark) * 1000.0
+        self._startup_mark = now
+
+    def _load_tiles(self):
+        """Load the tile images (from the atlas, if it is created), and build the 2x4 grid."""
+        atlas = load_tile_atlas(TILE_ATLAS_PATH, TILE_SIZE)
+        if atlas is None:
+            tile_images = [pygame.image.load(f"tile_images/{i+1}.png").convert_alpha() for i in range(8)]
+            tile_images = [pygame.transform.scale(img, (TILE_SIZE, TILE_SIZE)) for img in tile_images]
+        else:
+            tile_images, tile_rotations = atlas
+        cache_budget = MemoryBudget()  # one memory budget for the rotated images of all the tiles
+        self.tiles = [Tile(tile_images[i], i, self.animator, cache_budget) for i in range(8)]
+        # the tiles rest at multiples of 30 degrees; these rotations are in the atlas, or rendered in advance
+        for i, tile in enumerate(self.tiles):
+            if atlas is None:
+                tile.rotation_cache.prerender(range(0, 360, 30))
+            else:
+                for angle, surface in tile_rotations[i].items():
+                    tile.rotation_cache.put(angle, surface)
+        self._mark_startup("tiles")
+        self.invalidate()
+
+        if self.report_startup:
+            phases = ", ".join(f"{phase} {duration:.1f} ms" for phase, duration in self.startup_times.items())
+            print(f"Startup: {phases}; total {sum(self.startup_times.values()):.1f} ms")
 
     def _init_buttons(self):
         """Prepare the buttons for user interaction. Position and size values are defined here instead of constants.py,
@@ -57,74 +150,249 @@ class Hedgehog2D:
 
     def _do_turn(self, turn_config: dict):
         """Execute a turn based on the provided turn configuration dictionary. If pivot point is specified, it is a rotation."""
-        selected_tiles = [next(tile for tile in self.tiles if tile.grid_pos == pos) for pos in turn_config["from"]]
-        for tile, new_pos in zip(selected_tiles, turn_config["to"]):
-            tile.set_grid_pos(new_pos)
-            if "pivot_point" in turn_config:
-                tile.pivot_point = turn_config["pivot_point"]
-                tile.pivot_rotation_angle = turn_config["rotation_degree"]
-                tile.target_angle = (tile.target_angle + turn_config["target_angle_diff"]) % 360
+        selected_tiles = self.animator.tiles_at(turn_config["from"])
+        self.animator.set_grid_positions(selected_tiles, turn_config["to"])
+        if "pivot_point" in turn_config:
+            self.animator.start_pivot_rotation(selected_tiles, turn_config["pivot_point"],
+                                               turn_config["rotation_degree"], turn_config["target_angle_diff"])
 
     def _do_yb_turn(self):
         """Execute the second part of the gyro turn, which contains only local rotations."""
-        for tile in self.tiles:
-            if sum(tile.grid_pos) % 2 == 0:
-                tile.target_angle = (tile.target_angle + 30) % 360
-            else:
-                tile.target_angle = (tile.target_angle - 30) % 360
+        tiles = range(self.animator.num_tiles)
+        angles = [angle + (30 if sum(divmod(slot, COLS)) % 2 == 0 else -30)
+                  for slot, angle in zip(self.animator.grid_slots, self.animator.target_angle)]
+        self.animator.set_target_angles(tiles, angles)
 
     def _reset_tiles(self):
         """Bring all tiles back to their original positions and orientations, with animation."""
-        for i, tile in enumerate(self.tiles):
-            pos = (i // COLS, i % COLS)
-            tile.set_grid_pos(pos)
-            tile.target_angle = 0
-            tile.pivot_point = None
+        tiles = range(self.animator.num_tiles)
+        self.animator.set_grid_positions(tiles, [divmod(tile, COLS) for tile in tiles])
+        self.animator.set_target_angles(tiles, [0] * self.animator.num_tiles)
+
+    def apply_moves(self, moves: str | list[str] | MoveMacro):
+        """Apply a whole move sequence (for example "R U2 R' y x'") at once. The sequence is compiled into a single
+        sticker permutation and a single tile transform, so even a long macro costs one permutation. The tiles
+        slide to their new places without the pivot rotations."""
+        macro = moves if isinstance(moves, MoveMacro) else MoveMacro(moves)
+        transform = macro.tile_transform
+        tiles, slots = range(self.animator.num_tiles), list(self.animator.grid_slots)
+        angles = [angle + int(transform.angle_deltas[slot]) for slot, angle in zip(slots, self.animator.target_angle)]
+        self.animator.set_grid_positions(tiles, [divmod(int(transform.destinations[slot]), COLS) for slot in slots])
+        self.animator.set_target_angles(tiles, angles)
+        self.model3d.permute_stickers(macro.sticker_permutation)
+        self.invalidate()
 
     def _write_text_with_shadow(self, text, position):
-        shadow_text = self.font.render(text, True, BLACK_COLOR)
+        shadow_text = self.text_cache.render(self.font, text, BLACK_COLOR)
         self.screen.blit(shadow_text, (position[0] + SHADOW_OFFSET, position[1] + SHADOW_OFFSET))
-        main_text = self.font.render(text, True, WHITE_COLOR)
+        main_text = self.text_cache.render(self.font, text, WHITE_COLOR)
         self.screen.blit(main_text, position)
 
-    def display(self) -> bool:
-        """Main loop to run the Hedgehog application. Returns false if the application should quit."""
-        dt = self.clock.tick(FPS) / 1000.0  # Delta time in seconds
+    def invalidate(self, rect: pygame.Rect | None = None):
+        """Mark a screen area (or the whole screen) to be redrawn in the next frame, in dirty rectangle rendering mode."""
+        self._dirty_rects.append(rect if rect is not None else self.screen.get_rect())
+
+    def _mark(self, phase: str):
+        """End a phase of the frame, if the frames are profiled."""
+        if self.profiler is not None:
+            self.profiler.mark(phase)
 
+    def _draw_primitives(self):
         self.screen.fill(BACKGROUND_COLOR)
 
-        # primitives rendering
         for tile in self.tiles:
-            tile.update(dt)
             tile.draw(self.screen)
+        self._mark("tiles")
 
         for button in self.buttons.values():
             button.draw(self.screen, self.font)
+        self._mark("buttons")
 
         self.model3d.render(self.screen)
+        self._mark("model")
         self.slider.draw(self.screen)
+        self._mark("slider")
+
+    def _draw_texts(self):
+        self._write_text_with_shadow("2D Hedgehog v1.1", (10, 10))
+        self._write_text_with_shadow(f"Speed: {self.slider.value}", SLIDER_TEXT_POS)
+        if self.state_cache is not None:
+            # the state is analyzed only when the stickers change (the cache answers the known states from memory),
+            # and only after the solver is loaded in the background
+            if not self.state_cache.is_solver_loaded():
+                self._write_text_with_shadow("Moves to solve: ...", MOVES_TO_SOLVE_TEXT_POS)
+                return
+            if self.model3d.sticker_colors != self._analyzed_colors:
+                self._analyzed_colors = self.model3d.sticker_colors
+                self._moves_to_solve = self.state_cache.analyze_colors(self._analyzed_colors).distance
+            self._write_text_with_shadow(f"Moves to solve: {self._moves_to_solve}", MOVES_TO_SOLVE_TEXT_POS)
 
-        # event handling
-        for event in pygame.event.get():
+    def render(self):
+        """Draw the whole frame to the screen surface, without updating the display and handling events.
+        Together with do_move and TileAnimator.seek, this drives the application without user input (see offline_renderer.py)."""
+        self._draw_primitives()
+        self._draw_texts()
+
+    def display(self) -> bool:
+        """Main loop to run the Hedgehog application. Returns false if the application should quit.
+        A frame is an input -> simulate -> render pipeline, so the effect of an input is shown in the same frame."""
+        woke_up = False
+        if self.dirty_rect_rendering and not self._dirty_rects and not any(self.animator.is_animating()) and self.scheduler.is_idle():
+            # nothing changes until the next event, so block instead of redrawing the same frame again and again;
+            # the event is put back to be handled by the event loop below
+            pygame.event.post(pygame.event.wait())
+            self._last_poll = time.perf_counter()  # the event has just arrived
+            woke_up = True
+        dt = self.clock.tick(self.fps) / 1000.0  # Delta time in seconds
+        if woke_up:
+            dt = 0.0  # the idle time must not count as animation time
+        if self.profiler is not None:
+            self.profiler.begin_frame()
+
+        # input
+        if not self._handle_events():
+            return False
+        self._mark("events")
+
+        # simulate
+        self.scheduler.update()
+        for input_time in self.scheduler.shown_inputs():
+            self._input_shown(input_time)
+        if self.dirty_rect_rendering:
+            # the moving tiles have to be erased from their old places and drawn at their new ones
+            moving_tiles = [tile for tile, is_moving in zip(self.tiles, self.animator.is_animating()) if is_moving]
+            self._dirty_rects.extend(tile.get_rect() for tile in moving_tiles)
+            self.animator.update(dt)
+            self._dirty_rects.extend(tile.get_rect() for tile in moving_tiles)
+            dirty_rects, self._dirty_rects = self._dirty_rects, []
+            # everything is drawn as usual, but clipped to the changed area
+            if dirty_rects:
+                self.screen.set_clip(dirty_rects[0].unionall(dirty_rects[1:]))
+        else:
+            self.animator.update(dt)
+            dirty_rects = None
+        self._mark("update")
+
+        # render
+        is_drawing = dirty_rects is None or len(dirty_rects) > 0
+        if is_drawing:
+            self._draw_primitives()
+            self._draw_texts()
+            self._mark("texts")
+
+        if is_drawing and self.profiler is not None and self.profiler.show_overlay:
+            # the overlay shows the statistics of the previous frames, over everything else
+            self.screen.set_clip(None)
+            self.profiler.draw_overlay(self.screen)
+            if dirty_rects is not None:
+                dirty_rects.append(self.profiler.overlay_rect())
+            self._mark("overlay")
+
+        if dirty_rects is None:
+            pygame.display.update()
+        elif dirty_rects:
+            self.screen.set_clip(None)
+            pygame.display.update(dirty_rects)
+        self._mark("display")
+        if self.profiler is not None:
+            self.profiler.end_frame()
+
+        if not self.tiles:
+            # fast startup: the first frame is on the screen, now the tiles can be loaded
+            self._mark_startup("first frame")
+            self._load_tiles()
+        return True
+
+    def _handle_events(self) -> bool:
+        """Handle the events of the queue. Returns false if the application should quit."""
+        events = pygame.event.get()
+        # pygame does not tell when an event arrived, only that it arrived after the previous poll; the input latency
+        # is measured from there, so it includes the time the event waited in the queue (and at most a frame more)
+        input_time, self._last_poll = self._last_poll, time.perf_counter()
+        for event in events:
+            slider_value, knob_x = self.slider.value, self.slider.knob_x
             self.slider.handle_event(event)
-            for tile in self.tiles:
-                tile.update_speed(self.slider.value)
+            if self.slider.value != slider_value:
+                # the speed of the animations is recalculated only if the slider value changes
+                self.animator.update_speed(self.slider.value)
+            if self.slider.knob_x != knob_x:
+                self.invalidate(pygame.Rect(SLIDER_AREA))
+                self._input_shown(input_time)
 
             if event.type == pygame.QUIT:
+                if self.profiler is not None:
+                    self.profiler.dump()
                 pygame.quit()
                 return False
             elif event.type == pygame.MOUSEBUTTONDOWN:
-                self._handle_mouse_click(event)
-
-        # texts
-        self._write_text_with_shadow("2D Hedgehog v1.1", (10, 10))
-        self._write_text_with_shadow(f"Speed: {self.slider.value}", SLIDER_TEXT_POS)
-
-        pygame.display.update()
+                self._handle_mouse_click(event, input_time)
+                # a click can change the tiles, the 3D model and the buttons as well
+                self.invalidate()
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_v and event.mod & (pygame.KMOD_CTRL | pygame.KMOD_META):
+                self._paste_moves(input_time)
+            elif event.type in (pygame.WINDOWEXPOSED, pygame.WINDOWRESTORED, pygame.VIDEOEXPOSE, SOLVER_LOADED_EVENT):
+                self.invalidate()
         return True
 
-    def _handle_mouse_click(self, event):
+    def _input_shown(self, input_time: float):
+        """Record the latency of an input shown by the current frame, if the frames are profiled."""
+        if self.profiler is not None:
+            self.profiler.input_shown(input_time)
+
+    def _handle_mouse_click(self, event, input_time: float | None = None):
         button_id = self._which_button_is_clicked(event.pos)
+        if button_id is not None:
+            # the buttons follow the clicks at once, even if the move itself is still queued
+            self._update_buttons(button_id)
+            self.scheduler.submit([button_id], input_time)
+            if self.session_log is not None:
+                self.session_log.record(button_id)
+
+    def _paste_moves(self, input_time: float | None = None):
+        """Queue the move sequence on the clipboard (for example "R U2 R' y x'"), if it is a valid one."""
+        try:
+            move_ids = parse_moves(self._clipboard_text() or "")
+        except (pygame.error, ValueError):
+            return
+        if not move_ids:
+            return
+        # the split gyro halves must follow the rules of the buttons: yb comes right after ya, and only then
+        is_gyro_split = self.buttons["yb"].is_active
+        for move_id in move_ids:
+            if is_gyro_split != (move_id == "yb"):
+                return
+            is_gyro_split = move_id == "ya"
+        for move_id in move_ids:
+            self._update_buttons(move_id)
+            if self.session_log is not None:
+                self.session_log.record(move_id)
+        self.scheduler.submit(move_ids, input_time)
+
+    @staticmethod
+    def _clipboard_text() -> str | None:
+        # pygame-ce has get_text; pygame has get, which returns the text as a C string (with a NUL byte at the end)
+        if hasattr(pygame.scrap, "get_text"):
+            return pygame.scrap.get_text()
+        text = pygame.scrap.get(pygame.SCRAP_TEXT)
+        return None if text is None else text.decode(errors="replace").rstrip("\0")
+
+    def do_move(self, button_id: str):
+        """Execute the move (or reset) of a button at once, without the move scheduler."""
+        self.start_move(button_id)
+        self._update_buttons(button_id)
+
+    def _update_buttons(self, button_id: str):
+        """After a ya move, only the yb and reset buttons are active; after a yb move (or a reset), everything else."""
+        if button_id in ("ya", "yb"):
+            for button in self.buttons.values():
+                if button.text != "Reset":
+                    button.is_active = not button.is_active
+        elif button_id == "Reset":
+            for button in self.buttons.values():
+                button.is_active = button.text != "y (gyro) 2/2"
+
+    def start_move(self, button_id: str):
+        """Start the animation of the move (or reset) of a button, and update the 3D model."""
         match button_id:
             case "x":
                 self._do_turn(CW_R_TURN_CONFIG)
@@ -163,16 +431,8 @@ class Hedgehog2D:
             case "ya":
                 self._do_turn(YA_TURN_CONFIG)
                 self.model3d.permute_stickers(STICKER_PERMUTATION_Y)
-                # after a ya move, only yb and reset buttons are active
-                for button in self.buttons.values():
-                    if button.text != "Reset":
-                        button.is_active = not button.is_active
             case "yb":
                 self._do_yb_turn()
-                # after a yb move, everything else is active again
-                for button in self.buttons.values():
-                    if button.text != "Reset":
-                        button.is_active = not button.is_active
             case "y":
                 self._do_turn(YA_TURN_CONFIG)
                 self._do_yb_turn()
@@ -185,5 +445,3 @@ class Hedgehog2D:
             case "Reset":
                 self._reset_tiles()
                 self.model3d.reset()
-                for button in self.buttons.values():
-                    button.is_active = button.text != "y (gyro) 2/2"
@@ -1,9 +1,28 @@
 # The main entry point for the Hedgehog 2D application. For the web application, we have to use asyncio.
 
 from hedgehog2d import Hedgehog2D
+from frame_profiler import FrameProfiler
+from session_log import SessionLog
+from state_cache import StateCache
 import asyncio
+import sys
 
-hedgehog = Hedgehog2D()
+# "--dirty-rects" redraws only the changed areas and sleeps while nothing moves; it is meant for the desktop version,
+# as blocking on events would freeze the web application
+# "--profile" shows the frame times in an overlay; "--profile=frames.csv" (or .json) also saves them on exit
+profile_args = [arg for arg in sys.argv if arg.startswith("--profile")]
+profiler = FrameProfiler(show_overlay=True, dump_path=profile_args[0].partition("=")[2] or None) if profile_args else None
+# "--session-log=session.bin" appends the moves to a session log (see session_log.py)
+session_log_args = [arg.partition("=")[2] for arg in sys.argv if arg.startswith("--session-log=")]
+session_log = SessionLog(session_log_args[0]) if session_log_args else None
+# "--moves-to-solve" shows the number of moves to solve the current state; the results are kept in a persistent cache
+# (the first run builds the solver tables in the background, which takes up to a minute)
+state_cache = StateCache() if "--moves-to-solve" in sys.argv else None
+# the application starts in fast startup mode: the tiles are loaded after the first frame is shown;
+# "--startup-report" prints the duration of the startup phases
+hedgehog = Hedgehog2D(dirty_rect_rendering="--dirty-rects" in sys.argv, profiler=profiler,
+                      fast_startup=True, report_startup="--startup-report" in sys.argv, session_log=session_log,
+                      state_cache=state_cache)
 
 async def main():
     while True:
@@ -11,6 +30,10 @@ async def main():
         await asyncio.sleep(0)
 
         if not is_running:
+            if session_log is not None:
+                session_log.close()
+            if state_cache is not None:
+                state_cache.close()
             return
 
 
@@ -4,20 +4,52 @@ from constants import MODEL_STICKER_ORIGIN_SIZE, MODEL_STICKER_TARGET_SIZE, MODE
 import pygame
 
 class Model3D:
-    """A simple class to represent the 3D model of the cube. We render only the visible stickers, but it acts as a fully functional 3D puzzle."""
-    def __init__(self):
+    """A simple class to represent the 3D model of the cube. We render only the visible stickers, but it acts as a fully functional 3D puzzle.
+
+    The model is drawn at the given size, horizontally centered at center_x, starting from the given top y position.
+    The sticker polygons are scaled only once, and the model is drawn to an off-screen surface that is redrawn only when
+    the sticker colors change; every frame is just a single blit.
+    """
+    def __init__(self, size=MODEL_STICKER_TARGET_SIZE, center_x=WINDOW_WIDTH // 2, top=MODEL_3D_TOP_MARGIN):
+        self.rect = pygame.Rect(center_x - size[0] // 2, top, size[0], size[1])
+        # the sticker coordinates relative to the top-left corner of the model
+        self.sticker_polygons = [[(x / MODEL_STICKER_ORIGIN_SIZE[0] * size[0], y / MODEL_STICKER_ORIGIN_SIZE[1] * size[1])
+                                  for (x, y) in sticker_pos]
+                                 for sticker_pos in STICKER_POSITIONS]
+        self.surface = None
         self.reset()
 
+    @property
+    def sticker_colors(self) -> list[tuple[int, int, int]]:
+        return self._sticker_colors
+
+    @sticker_colors.setter
+    def sticker_colors(self, sticker_colors: list[tuple[int, int, int]]):
+        self._sticker_colors = sticker_colors
+        self._is_surface_outdated = True
+
     def reset(self):
         self.sticker_colors = STICKER_COLORS.copy()
 
     def permute_stickers(self, permutation: list[int], repetition=1):
+        sticker_colors = self.sticker_colors
         for _ in range(repetition):
-            self.sticker_colors = [self.sticker_colors[i] for i in permutation]
+            sticker_colors = [sticker_colors[i] for i in permutation]
+        self.sticker_colors = sticker_colors
+
+    def _redraw_surface(self):
+        if self.surface is None:
+            self.surface = pygame.Surface(self.rect.size, pygame.SRCALPHA)
+        self.surface.fill((0, 0, 0, 0))
+        for sticker_color, sticker in zip(self.sticker_colors, self.sticker_polygons):
+            pygame.draw.polygon(self.surface, sticker_color, sticker, 0)
+        self._is_surface_outdated = False
+
+    def get_surface(self) -> pygame.surface.Surface:
+        """The off-screen surface of the model, redrawn if the sticker colors changed."""
+        if self._is_surface_outdated:
+            self._redraw_surface()
+        return self.surface
 
     def render(self, screen: pygame.surface.Surface):
-        for sticker_color, sticker_pos in zip(self.sticker_colors, STICKER_POSITIONS):
-            sticker = [(x / MODEL_STICKER_ORIGIN_SIZE[0] * MODEL_STICKER_TARGET_SIZE[0] + WINDOW_WIDTH // 2 - MODEL_STICKER_TARGET_SIZE[0] // 2,
-                        y / MODEL_STICKER_ORIGIN_SIZE[1] * MODEL_STICKER_TARGET_SIZE[1] + MODEL_3D_TOP_MARGIN)
-                    for (x, y) in sticker_pos]
-            pygame.draw.polygon(screen, sticker_color, sticker, 0)
+        screen.blit(self.get_surface(), self.rect)
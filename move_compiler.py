@@ -0,0 +1,147 @@
+from constants import COLS, ROWS
+from constants import CW_R_TURN_CONFIG, CCW_R_TURN_CONFIG, CW_L_TURN_CONFIG, CCW_L_TURN_CONFIG
+from constants import U2_TURN_CONFIG, D2_TURN_CONFIG, F2_TURN_CONFIG, B2_TURN_CONFIG, YA_TURN_CONFIG
+from puzzle_state import MOVE_PERMUTATIONS, MOVE_NAMES, compose
+
+import numpy as np
+
+# A move sequence like "R U2 R' y x'" is compiled into one sticker permutation (for Model3D and puzzle_state.py) and one
+# tile transform (for the 2D tiles), so that applying even a very long sequence costs a single permutation.
+#
+# A tile transform describes where the tile on each grid slot (row * COLS + col) goes, and how much its angle changes.
+NUM_SLOTS = ROWS * COLS
+
+
+def _slot(pos: tuple[int, int]) -> int:
+    return pos[0] * COLS + pos[1]
+
+
+class TileTransform:
+    """The effect of moves on the 2D tiles: the tile on slot i moves to slot destinations[i], and its target angle
+    changes by angle_deltas[i] degrees."""
+    def __init__(self, destinations=None, angle_deltas=None):
+        self.destinations = np.arange(NUM_SLOTS) if destinations is None else np.asarray(destinations)
+        self.angle_deltas = np.zeros(NUM_SLOTS, dtype=int) if angle_deltas is None else np.asarray(angle_deltas)
+
+    @classmethod
+    def from_turn_config(cls, turn_config: dict) -> "TileTransform":
+        """The same turn as Hedgehog2D._do_turn does with the given configuration."""
+        transform = cls()
+        for from_pos, to_pos in zip(turn_config["from"], turn_config["to"]):
+            transform.destinations[_slot(from_pos)] = _slot(to_pos)
+            if "pivot_point" in turn_config:
+                transform.angle_deltas[_slot(from_pos)] = turn_config["target_angle_diff"]
+        return transform
+
+    @classmethod
+    def yb_turn(cls) -> "TileTransform":
+        """The same turn as Hedgehog2D._do_yb_turn: only local rotations, depending on the parity of the slot."""
+        rows, cols = np.divmod(np.arange(NUM_SLOTS), COLS)
+        return cls(angle_deltas=np.where((rows + cols) % 2 == 0, 30, -30))
+
+    def then(self, other: "TileTransform") -> "TileTransform":
+        """Return the transform that applies this one first, then the other one."""
+        return TileTransform(other.destinations[self.destinations],
+                             (self.angle_deltas + other.angle_deltas[self.destinations]) % 360)
+
+
+_CW_R, _CCW_R = TileTransform.from_turn_config(CW_R_TURN_CONFIG), TileTransform.from_turn_config(CCW_R_TURN_CONFIG)
+_CW_L, _CCW_L = TileTransform.from_turn_config(CW_L_TURN_CONFIG), TileTransform.from_turn_config(CCW_L_TURN_CONFIG)
+_YA, _YB = TileTransform.from_turn_config(YA_TURN_CONFIG), TileTransform.yb_turn()
+_Y = _YA.then(_YB)
+
+# The tile transform of every move of Hedgehog2D._handle_mouse_click
+TILE_TRANSFORMS: dict[str, TileTransform] = {
+    "x":  _CW_R.then(_CCW_L),
+    "xp": _CCW_R.then(_CW_L),
+    "L":  _CW_L,
+    "Lp": _CCW_L,
+    "R":  _CW_R,
+    "Rp": _CCW_R,
+    "U2": TileTransform.from_turn_config(U2_TURN_CONFIG),
+    "D2": TileTransform.from_turn_config(D2_TURN_CONFIG),
+    "F2": TileTransform.from_turn_config(F2_TURN_CONFIG),
+    "B2": TileTransform.from_turn_config(B2_TURN_CONFIG),
+    "ya": _YA,
+    "yb": _YB,
+    "y":  _Y,
+    "yp": _Y.then(_Y).then(_Y),
+}
+
+# For the simplification, every move is a turn of a layer (or the whole cube) around an axis by a number of quarter turns.
+# Moves around the same axis commute, so they can be merged even if they are not next to each other (for example R L R').
+# The split gyro halves are not merged with anything.
+_MOVE_TURNS = {"x": ("x", "x", 1), "xp": ("x", "x", 3), "L": ("x", "L", 1), "Lp": ("x", "L", 3), "R": ("x", "R", 1), "Rp": ("x", "R", 3),
+               "U2": ("y", "U", 2), "D2": ("y", "D", 2), "y": ("y", "y", 1), "yp": ("y", "y", 3),
+               "F2": ("z", "F", 2), "B2": ("z", "B", 2)}
+# the moves to emit for a layer turned by 1, 2 or 3 quarter turns; U, D, F and B only have half turns
+_TURN_MOVES = {"x": (["x"], ["x", "x"], ["xp"]), "L": (["L"], ["L", "L"], ["Lp"]), "R": (["R"], ["R", "R"], ["Rp"]),
+               "y": (["y"], ["y", "y"], ["yp"]), "U": (None, ["U2"], None), "D": (None, ["D2"], None),
+               "F": (None, ["F2"], None), "B": (None, ["B2"], None)}
+# the usual notation of the moves; x2, R2 etc. are also accepted, although there is no button for them
+_NOTATION = {name: [move_id] for move_id, name in MOVE_NAMES.items()}
+_NOTATION.update({f"{layer}2": moves[1] for layer, moves in _TURN_MOVES.items()})
+
+
+def parse_moves(text: str) -> list[str]:
+    """Parse a space separated move sequence in the usual notation (for example "R U2 R' y x'") into move ids.
+    The button ids (for example "Rp") and the split gyro halves ("ya", "yb") are accepted too."""
+    move_ids = []
+    for token in text.split():
+        if token in _NOTATION:
+            move_ids.extend(_NOTATION[token])
+        elif token in MOVE_PERMUTATIONS:
+            move_ids.append(token)
+        else:
+            raise ValueError(f"Unknown move: {token}")
+    return move_ids
+
+
+def simplify(move_ids: list[str]) -> list[str]:
+    """Cancel and merge redundant moves, for example R R', U2 U2, four R's, or R L R'."""
+    # groups of consecutive moves around the same axis, as (axis, {layer: quarter turns}); None is a split gyro half
+    groups: list[tuple[str | None, dict[str, int] | str]] = []
+    for move_id in move_ids:
+        if move_id not in _MOVE_TURNS:
+            groups.append((None, move_id))
+            continue
+        axis, layer, quarter_turns = _MOVE_TURNS[move_id]
+        if not groups or groups[-1][0] != axis:
+            groups.append((axis, {}))
+        turns = groups[-1][1]
+        turns[layer] = (turns.get(layer, 0) + quarter_turns) % 4
+        if turns[layer] == 0:
+            del turns[layer]
+            # the whole group cancelled out, so the next move may merge with the group before it
+            if not turns:
+                groups.pop()
+
+    simplified = []
+    for axis, turns in groups:
+        if axis is None:
+            simplified.append(turns)
+        else:
+            for layer, quarter_turns in turns.items():
+                simplified.extend(_TURN_MOVES[layer][quarter_turns - 1])
+    return simplified
+
+
+class MoveMacro:
+    """A move sequence compiled into a single sticker permutation and a single tile transform."""
+    def __init__(self, moves: str | list[str]):
+        self.move_ids = []
+        self.sticker_permutation = compose()
+        self.tile_transform = TileTransform()
+        self.extend(moves)
+
+    def extend(self, moves: str | list[str]):
+        """Append moves to the macro, for example to compile a long sequence in parts. The appended moves are
+        simplified on their own, not together with the moves already in the macro."""
+        move_ids = simplify(parse_moves(moves) if isinstance(moves, str) else list(moves))
+        self.move_ids.extend(move_ids)
+        self.sticker_permutation = compose(self.sticker_permutation, *(MOVE_PERMUTATIONS[move_id] for move_id in move_ids))
+        for move_id in move_ids:
+            self.tile_transform = self.tile_transform.then(TILE_TRANSFORMS[move_id])
+
+    def __len__(self):
+        return len(self.move_ids)
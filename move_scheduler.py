@@ -0,0 +1,101 @@
+from constants import MOVE_QUEUE_SKIP_THRESHOLD, MOVE_SCHEDULER_FRAME_BUDGET, MOVE_SCHEDULER_CHUNK_SIZE
+from move_compiler import MoveMacro, simplify
+
+from collections import deque
+import time
+
+# The move scheduler stands between the input and the tile animations. The moves are queued, and a move starts only
+# when the tiles of the previous one came to rest, so the tiles are not retargeted in the middle of a turn.
+# The queued moves are simplified together (see move_compiler.simplify), so moves that cancel each other are never
+# animated. If the queue grows longer than MOVE_QUEUE_SKIP_THRESHOLD (for example, a long pasted algorithm), the queue
+# skips ahead: the queued moves are compiled into a single macro, a chunk in each frame, within a time budget so the
+# frames keep coming, and the tiles slide to the final state at once.
+#
+# For the input latency (see frame_profiler.py), the scheduler also tells when the move of an input is shown: the moves
+# are counted as they start, and an input is shown once every move queued up to and including its own has started
+# (the moves cancelled by simplify never start, so the count of an input shrinks with the queue).
+
+
+class MoveScheduler:
+    """Schedule the moves (button ids, "Reset" included) of a Hedgehog2D application."""
+    def __init__(self, hedgehog, skip_threshold=MOVE_QUEUE_SKIP_THRESHOLD, frame_budget=MOVE_SCHEDULER_FRAME_BUDGET,
+                 chunk_size=MOVE_SCHEDULER_CHUNK_SIZE):
+        self.hedgehog = hedgehog
+        self.skip_threshold = skip_threshold
+        self.frame_budget = frame_budget  # the time spent on compiling skipped moves in a frame, in seconds
+        self.chunk_size = chunk_size
+        self.pending: deque[str] = deque()  # the moves not started yet
+        self._skipped: deque[str] = deque()  # the moves being compiled into self._macro
+        self._macro: MoveMacro | None = None
+        self._num_compiled = 0  # the number of skipped moves compiled into self._macro so far
+        self._num_started = 0  # the number of moves started so far (the skipped ones included)
+        self._inputs: deque[tuple[float, int]] = deque()  # (input time, number of started moves that shows it)
+
+    def _num_queued(self) -> int:
+        """The number of moves started so far, plus the ones still queued or being skipped."""
+        return self._num_started + self._num_compiled + len(self._skipped) + len(self.pending)
+
+    def submit(self, move_ids: list[str], input_time: float | None = None):
+        """Queue moves. The queued moves are simplified together; a reset drops the moves queued before it, so a queued
+        reset is always the first move of the queue. If the input time is given, it is returned by shown_inputs
+        in the frame that starts the last of these moves."""
+        move_ids = list(move_ids)
+        if "Reset" in move_ids:
+            self.pending.clear()
+            move_ids = move_ids[len(move_ids) - 1 - move_ids[::-1].index("Reset"):]
+        # the split gyro halves and the reset separate the groups that simplify can merge
+        self.pending = deque(simplify(list(self.pending) + move_ids))
+        num_queued = self._num_queued()
+        self._inputs = deque((arrival, min(target, num_queued)) for arrival, target in self._inputs)
+        if input_time is not None:
+            self._inputs.append((input_time, num_queued))
+
+    def shown_inputs(self) -> list[float]:
+        """The times of the inputs whose moves have all started (so the next frame shows them), since the last call."""
+        shown = []
+        while self._inputs and self._inputs[0][1] <= self._num_started:
+            shown.append(self._inputs.popleft()[0])
+        return shown
+
+    def clear(self):
+        """Drop the queued moves, and stop skipping ahead."""
+        self.pending.clear()
+        self._skipped.clear()
+        self._macro = None
+        self._num_compiled = 0
+        self._inputs.clear()
+
+    def is_idle(self) -> bool:
+        return not self.pending and self._macro is None
+
+    def update(self):
+        """Start the next move, or continue skipping ahead; called once per frame, before the animation update."""
+        if self._macro is None and len(self.pending) > self.skip_threshold:
+            self._start_skip()
+        if self._macro is not None:
+            self._continue_skip()
+        elif self.pending and not any(self.hedgehog.animator.is_animating()):
+            self.hedgehog.start_move(self.pending.popleft())
+            self.hedgehog.invalidate()
+            self._num_started += 1
+
+    def _start_skip(self):
+        self._skipped, self.pending = self.pending, deque()
+        self._macro = MoveMacro([])
+        self._num_compiled = 0
+        # a queued reset is always the first move (see submit); the reset is not a move of a macro
+        if self._skipped[0] == "Reset":
+            self.hedgehog.start_move(self._skipped.popleft())
+            self._num_started += 1
+
+    def _continue_skip(self):
+        deadline = time.perf_counter() + self.frame_budget
+        while self._skipped and time.perf_counter() < deadline:
+            chunk = [self._skipped.popleft() for _ in range(min(self.chunk_size, len(self._skipped)))]
+            self._macro.extend(chunk)
+            self._num_compiled += len(chunk)
+        if not self._skipped:
+            self.hedgehog.apply_moves(self._macro)
+            self._macro = None
+            self._num_started += self._num_compiled
+            self._num_compiled = 0
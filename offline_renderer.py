@@ -0,0 +1,165 @@
+from constants import FPS, WINDOW_WIDTH, WINDOW_HEIGHT, TURN_ANIMATION_DURATION
+from move_compiler import parse_moves
+
+from collections import deque
+import argparse
+import itertools
+import math
+import multiprocessing.pool
+import os
+import sys
+
+# the dummy video driver renders to memory, without a window; the banner of pygame would get mixed into the frames
+# streamed to stdout; the signal handlers of SDL would turn the SIGTERM of the pool into a quit event, and the workers
+# would never exit; all of them have to be set before pygame is imported
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+os.environ.setdefault("SDL_NO_SIGNAL_HANDLERS", "1")
+
+from hedgehog2d import Hedgehog2D
+from tile_animation import speed_from_slider
+import pygame
+
+# Renders move sequences to image files (or a raw video stream) without a display, for demo videos and test fixtures.
+#
+# The timeline is deterministic: the moves start at fixed times (one every move_interval seconds, by default the duration
+# of a turn at the speed of the slider, so the turns follow each other without overlapping), and frame k shows
+# the poses at time k / fps, evaluated in closed form by TileAnimator.seek. A frame does not depend on the frames
+# before it, so a long sequence can be split into chunks of frames and rendered in parallel: every worker replays the
+# moves that start before its chunk, and its frames line up exactly with the other chunks.
+#
+# Example: render a scramble to a video with ffmpeg
+#   python offline_renderer.py "R U2 R' F2 y x'" --format rgba --output - |
+#       ffmpeg -f rawvideo -pix_fmt rgba -s 800x700 -r 60 -i - scramble.mp4
+
+FORMATS = ("png", "rgba")
+
+
+class Timeline:
+    """The moves of a sequence with their start times, and the frames to render."""
+    def __init__(self, moves: str | list[str], fps=FPS, move_interval: float | None = None, speed=50):
+        self.move_ids = parse_moves(moves) if isinstance(moves, str) else list(moves)
+        self.fps = fps
+        self.speed = speed  # the slider value
+        # the duration of a turn at this speed (the slider slows the animations down below 50)
+        self.turn_duration = TURN_ANIMATION_DURATION / speed_from_slider(speed)
+        self.move_interval = self.turn_duration if move_interval is None else move_interval
+        # the last move gets the time to finish its animation
+        end_time = max(len(self.move_ids) - 1, 0) * self.move_interval + self.turn_duration
+        self.num_frames = math.ceil(end_time * fps)
+
+    def frame_time(self, frame: int) -> float:
+        return frame / self.fps
+
+    def move_time(self, move: int) -> float:
+        return move * self.move_interval
+
+
+def render_frames(timeline: Timeline, first_frame: int, last_frame: int):
+    """Yield the (frame index, screen surface) pairs of the frames first_frame <= frame < last_frame.
+    The surface is reused, so it has to be saved before the next frame is requested."""
+    hedgehog = Hedgehog2D()
+    hedgehog.slider.set_value(timeline.speed)
+    hedgehog.animator.update_speed(timeline.speed)
+    next_move = 0
+    for frame in range(first_frame, last_frame):
+        time = timeline.frame_time(frame)
+        # start the moves in order, each at its own start time; the moves before the first frame are replayed as well
+        while next_move < len(timeline.move_ids) and timeline.move_time(next_move) <= time:
+            hedgehog.animator.seek(timeline.move_time(next_move))
+            hedgehog.do_move(timeline.move_ids[next_move])
+            next_move += 1
+        hedgehog.animator.seek(time)
+        hedgehog.render()
+        yield frame, hedgehog.screen
+
+
+def _save_frame(screen: pygame.surface.Surface, directory: str, frame: int, format: str):
+    path = os.path.join(directory, f"frame_{frame:06d}.{format}")
+    if format == "png":
+        pygame.image.save(screen, path)
+    else:
+        with open(path, "wb") as f:
+            f.write(pygame.image.tobytes(screen, "RGBA"))
+
+
+def _render_chunk_to_directory(args) -> int:
+    timeline, first_frame, last_frame, directory, format = args
+    for frame, screen in render_frames(timeline, first_frame, last_frame):
+        _save_frame(screen, directory, frame, format)
+    return last_frame - first_frame
+
+
+def _render_chunk_to_bytes(args) -> list[bytes]:
+    timeline, first_frame, last_frame = args
+    return [pygame.image.tobytes(screen, "RGBA") for _, screen in render_frames(timeline, first_frame, last_frame)]
+
+
+def render(timeline: Timeline, output: str, format="png", processes: int | None = 1, chunk_size=120):
+    """Render every frame of the timeline into the output directory (one file per frame), or as a raw RGBA stream
+    to stdout if the output is "-". With more than one process, the chunks of chunk_size frames are rendered in parallel.
+    A streamed chunk is held in memory until it is written (about 270 MB for 120 frames), so only one chunk per process
+    is in flight at a time: a slow reader of the stream holds the workers back, instead of piling up finished chunks."""
+    if format not in FORMATS:
+        raise ValueError(f"Unknown format: {format}")
+    if output == "-" and format != "rgba":
+        raise ValueError("Only the rgba format can be streamed")
+    chunks = [(first_frame, min(first_frame + chunk_size, timeline.num_frames))
+              for first_frame in range(0, timeline.num_frames, chunk_size)]
+
+    if output == "-":
+        tasks = [(timeline, first_frame, last_frame) for first_frame, last_frame in chunks]
+        worker = _render_chunk_to_bytes
+    else:
+        os.makedirs(output, exist_ok=True)
+        tasks = [(timeline, first_frame, last_frame, output, format) for first_frame, last_frame in chunks]
+        worker = _render_chunk_to_directory
+
+    if processes == 1:
+        _collect(map(worker, tasks), output)
+    else:
+        processes = processes or os.cpu_count() or 1
+        with multiprocessing.Pool(processes) as pool:
+            _collect(_ordered_results(pool, worker, tasks, max_in_flight=processes), output)
+
+
+def _ordered_results(pool: multiprocessing.pool.Pool, worker, tasks: list, max_in_flight: int):
+    """Yield the results of the tasks in order (so the stream stays in frame order), like pool.imap, but with at most
+    max_in_flight tasks submitted and not yet consumed."""
+    tasks = iter(tasks)
+    in_flight = deque(pool.apply_async(worker, (task,)) for task in itertools.islice(tasks, max_in_flight))
+    while in_flight:
+        result = in_flight.popleft().get()
+        # the next task starts as soon as the oldest result is taken, while that result is being written
+        in_flight.extend(pool.apply_async(worker, (task,)) for task in itertools.islice(tasks, 1))
+        yield result
+
+
+def _collect(results, output: str):
+    """Wait for the chunks in order, and write the frames to the stream if the output is "-"."""
+    for result in results:
+        if output == "-":
+            for frame_bytes in result:
+                sys.stdout.buffer.write(frame_bytes)
+            sys.stdout.buffer.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render a move sequence of the 2D Hedgehog without a display.")
+    parser.add_argument("moves", help="the move sequence, for example \"R U2 R' y x'\"")
+    parser.add_argument("--output", default="frames", help="the output directory, or - to stream raw RGBA frames to stdout")
+    parser.add_argument("--format", choices=FORMATS, default="png")
+    parser.add_argument("--fps", type=int, default=FPS)
+    parser.add_argument("--move-interval", type=float, default=None, help="seconds between the moves (default: the duration of a turn at the speed)")
+    parser.add_argument("--speed", type=int, default=50, help="the speed slider value (1-100)")
+    parser.add_argument("--processes", type=int, default=None, help="number of worker processes (default: all CPUs)")
+    parser.add_argument("--chunk-size", type=int, default=120, help="number of frames rendered by a worker at once")
+    args = parser.parse_args()
+
+    timeline = Timeline(args.moves, args.fps, args.move_interval, args.speed)
+    render(timeline, args.output, args.format, args.processes, args.chunk_size)
+    print(f"Rendered {timeline.num_frames} frames of {WINDOW_WIDTH}x{WINDOW_HEIGHT} pixels", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+from constants import STICKER_COLORS
+from constants import STICKER_PERMUTATION_R, STICKER_PERMUTATION_L, STICKER_PERMUTATION_U2, STICKER_PERMUTATION_D2
+from constants import STICKER_PERMUTATION_F2, STICKER_PERMUTATION_B2, STICKER_PERMUTATION_Y
+
+import numpy as np
+
+# A headless representation of the 3D puzzle, without any pygame dependency. A state is a uint8 array of 24 sticker indices:
+# state[i] is the index of the sticker (its position in the solved STICKER_COLORS layout) that currently sits at position i.
+# A batch of N states is simply an (N, 24) array, so every operation below works on a single state and on a batch as well.
+NUM_STICKERS = 24
+STATE_DTYPE = np.uint8
+
+
+def compose(*permutations) -> np.ndarray:
+    """Compose sticker permutations into a single one. The first permutation is applied first,
+    exactly like consecutive `Model3D.permute_stickers` calls."""
+    result = np.arange(NUM_STICKERS, dtype=STATE_DTYPE)
+    for permutation in permutations:
+        result = result[np.asarray(permutation)]
+    return result
+
+
+def invert(permutation) -> np.ndarray:
+    """Return the permutation that undoes the given one."""
+    inverse = np.empty(NUM_STICKERS, dtype=STATE_DTYPE)
+    inverse[np.asarray(permutation)] = np.arange(NUM_STICKERS, dtype=STATE_DTYPE)
+    return inverse
+
+
+# The sticker permutation of every move of Hedgehog2D._handle_mouse_click (the Reset button is not a move).
+# The composite moves are composed in the same order as the GUI applies them.
+_R, _L, _Y = STICKER_PERMUTATION_R, STICKER_PERMUTATION_L, STICKER_PERMUTATION_Y
+MOVE_PERMUTATIONS: dict[str, np.ndarray] = {
+    "x":  compose(_R, _L, _L, _L),
+    "xp": compose(_R, _R, _R, _L),
+    "L":  compose(_L),
+    "Lp": compose(_L, _L, _L),
+    "R":  compose(_R),
+    "Rp": compose(_R, _R, _R),
+    "U2": compose(STICKER_PERMUTATION_U2),
+    "D2": compose(STICKER_PERMUTATION_D2),
+    "F2": compose(STICKER_PERMUTATION_F2),
+    "B2": compose(STICKER_PERMUTATION_B2),
+    "ya": compose(_Y),
+    "yb": compose(),  # the second half of the gyro only adjusts the tiles; the stickers are already in place
+    "y":  compose(_Y),
+    "yp": compose(_Y, _Y, _Y),
+}
+
+# The complete moves of the puzzle (the split gyro halves are left out); the row order of MOVE_TABLE follows this tuple
+MOVE_IDS = ("x", "xp", "L", "Lp", "R", "Rp", "U2", "D2", "F2", "B2", "y", "yp")
+MOVE_TABLE = np.stack([MOVE_PERMUTATIONS[move_id] for move_id in MOVE_IDS])
+# the usual notation of the moves, as written on the buttons
+MOVE_NAMES = {"x": "x", "xp": "x'", "L": "L", "Lp": "L'", "R": "R", "Rp": "R'",
+              "U2": "U2", "D2": "D2", "F2": "F2", "B2": "B2", "y": "y", "yp": "y'"}
+INVERSE_MOVES = {"x": "xp", "xp": "x", "L": "Lp", "Lp": "L", "R": "Rp", "Rp": "R",
+                 "U2": "U2", "D2": "D2", "F2": "F2", "B2": "B2", "y": "yp", "yp": "y"}
+
+
+def solved_states(n: int = 1) -> np.ndarray:
+    """Return an (n, 24) batch of solved states."""
+    return np.tile(np.arange(NUM_STICKERS, dtype=STATE_DTYPE), (n, 1))
+
+
+def apply_permutation(states: np.ndarray, permutation, out: np.ndarray | None = None) -> np.ndarray:
+    """Apply one sticker permutation to a single state or to a whole batch with one fancy-indexing call.
+    A preallocated `out` array of the same shape can be given to avoid allocating a new batch; it must not be `states`."""
+    return np.take(states, np.asarray(permutation), axis=-1, out=out)
+
+
+def apply_move(states: np.ndarray, move_id: str, out: np.ndarray | None = None) -> np.ndarray:
+    return apply_permutation(states, MOVE_PERMUTATIONS[move_id], out=out)
+
+
+def apply_moves(states: np.ndarray, move_ids: list[str], out: np.ndarray | None = None) -> np.ndarray:
+    """Apply a sequence of moves. The moves are composed first (24 entries each), so the batch is permuted only once."""
+    return apply_permutation(states, compose(*(MOVE_PERMUTATIONS[move_id] for move_id in move_ids)), out=out)
+
+
+def apply_move_indices(states: np.ndarray, move_indices: np.ndarray) -> np.ndarray:
+    """Apply a different move to every state of an (N, 24) batch; move_indices holds N indices into MOVE_IDS."""
+    return np.take_along_axis(states, MOVE_TABLE[move_indices], axis=1)
+
+
+def is_solved(states: np.ndarray) -> np.ndarray | bool:
+    return np.all(states == np.arange(NUM_STICKERS, dtype=STATE_DTYPE), axis=-1)
+
+
+def to_colors(state: np.ndarray) -> list[tuple[int, int, int]]:
+    """Convert a single state to the list of RGB colors used by Model3D.sticker_colors."""
+    return [STICKER_COLORS[i] for i in state]
@@ -0,0 +1,159 @@
+import itertools
+import numpy as np
+
+# A headless state engine of the 4D 2x2x2x2 puzzle, the physical Hedgehog that the 3D model and the 2D tiles mirror.
+#
+# The 16 pieces sit at the vertices of a tesseract: the position (and the home position of the piece) with index i has the
+# coordinate +1 along axis a if bit a of i is set, and -1 otherwise (the axes are x, y, z, w). A piece has 4 stickers, one
+# along each axis. Its orientation is the axis permutation sigma, where sigma[j] is the axis the sticker of home axis j
+# points along. The moves are rotations, so the parity of sigma follows from the piece and its position, and only 12
+# orientations are possible in each case: the orientation is stored as the index o of the even permutation
+# EVEN_PERMUTATIONS[o] = sigma (if sigma is even) or sigma composed with _SWAP (if it is odd).
+#
+# A state is a uint8 array of 16 values, piece * 12 + orientation, one for each position, so a state is 16 bytes, and
+# a batch of N states is an (N, 16) array; like in puzzle_state.py, every operation works on a batch as well.
+AXES = "xyzw"
+NUM_PIECES = 16
+NUM_ORIENTATIONS = 12
+NUM_VALUES = NUM_PIECES * NUM_ORIENTATIONS
+STATE_DTYPE = np.uint8
+
+# the cells (the 3D halves of the puzzle) by axis and side; a twist turns the pieces of one cell
+CELLS = {"R": (0, 1), "L": (0, 0), "U": (1, 1), "D": (1, 0), "F": (2, 1), "B": (2, 0), "O": (3, 1), "I": (3, 0)}
+
+
+def _parity(permutation) -> int:
+    return sum(permutation[i] > permutation[j] for i, j in itertools.combinations(range(len(permutation)), 2)) % 2
+
+
+EVEN_PERMUTATIONS = np.array([p for p in itertools.permutations(range(len(AXES))) if _parity(p) == 0], dtype=np.intp)
+_ORIENTATION_INDEX = {tuple(p): o for o, p in enumerate(EVEN_PERMUTATIONS.tolist())}
+_SWAP = np.array([1, 0, 2, 3])
+
+
+class PieceMove:
+    """A move of the 4D puzzle: the new value of position i is values[i, state[sources[i]]]. Moves compose like
+    permutations, so a sequence of moves is applied to a batch with one gather and one table lookup."""
+    def __init__(self, sources: np.ndarray, values: np.ndarray):
+        self.sources = sources  # (16,)
+        self.values = values    # (16, NUM_VALUES)
+
+    def then(self, other: "PieceMove") -> "PieceMove":
+        """This move followed by the other one."""
+        return PieceMove(self.sources[other.sources], np.take_along_axis(other.values, self.values[other.sources], axis=1))
+
+
+def identity_move() -> PieceMove:
+    return PieceMove(np.arange(NUM_PIECES), np.tile(np.arange(NUM_VALUES, dtype=STATE_DTYPE), (NUM_PIECES, 1)))
+
+
+def rotation_move(axis_a: int, axis_b: int, cell: tuple[int, int] | None = None) -> PieceMove:
+    """The 90 degree rotation from axis_a towards axis_b of the pieces of a cell (axis, side), or of the whole puzzle."""
+    rotation = np.arange(len(AXES))
+    rotation[[axis_a, axis_b]] = axis_b, axis_a
+    # the new orientation index does not depend on the piece or the position (see the top of the file)
+    turned = np.array([_ORIENTATION_INDEX[tuple(rotation[p][_SWAP] if _parity(rotation) else rotation[p])]
+                       for p in EVEN_PERMUTATIONS], dtype=STATE_DTYPE)
+    pieces, orientations = np.divmod(np.arange(NUM_VALUES), NUM_ORIENTATIONS)
+    turned_values = (pieces * NUM_ORIENTATIONS + turned[orientations]).astype(STATE_DTYPE)
+
+    move = identity_move()
+    for position in range(NUM_PIECES):
+        if cell is not None and (position >> cell[0]) & 1 != cell[1]:
+            continue
+        # the coordinate along axis_a moves to axis_b, and the one along axis_b moves to axis_a, negated
+        bit_a, bit_b = (position >> axis_a) & 1, (position >> axis_b) & 1
+        destination = position & ~((1 << axis_a) | (1 << axis_b)) | (bit_a << axis_b) | ((1 - bit_b) << axis_a)
+        move.sources[destination] = position
+        move.values[destination] = turned_values
+    return move
+
+
+def compose(*moves: PieceMove) -> PieceMove:
+    """Compose moves into a single one; the first move is applied first."""
+    result = identity_move()
+    for move in moves:
+        result = result.then(move)
+    return result
+
+
+def _plane_name(axis_a: int, axis_b: int) -> str:
+    return AXES[axis_a] + AXES[axis_b]
+
+
+# The moves: the quarter twists of the cells in the three planes of the cell (like "R.yz" and its inverse "R.yz'"),
+# and the quarter rotations of the whole puzzle in the six planes (like "xy" and "xy'").
+MOVES: dict[str, PieceMove] = {}
+for _name, (_axis, _side) in CELLS.items():
+    for _a, _b in itertools.combinations([a for a in range(len(AXES)) if a != _axis], 2):
+        MOVES[f"{_name}.{_plane_name(_a, _b)}"] = rotation_move(_a, _b, (_axis, _side))
+        MOVES[f"{_name}.{_plane_name(_a, _b)}'"] = rotation_move(_b, _a, (_axis, _side))
+for _a, _b in itertools.combinations(range(len(AXES)), 2):
+    MOVES[_plane_name(_a, _b)] = rotation_move(_a, _b)
+    MOVES[_plane_name(_a, _b) + "'"] = rotation_move(_b, _a)
+
+# The gyro turns the whole puzzle in the x-w plane, exchanging the left and right cells with the inner and outer ones.
+# The physical puzzle cannot turn in this plane at once, so the gyro is composed of the same turn of the two halves
+# along the y axis, just like the gyro of the 2D puzzle is composed of its two halves (ya and yb).
+MOVES["gyro"] = compose(MOVES["U.xw"], MOVES["D.xw"])
+MOVES["gyro'"] = compose(MOVES["U.xw'"], MOVES["D.xw'"])
+
+MOVE_IDS = tuple(MOVES)
+# MOVE_SOURCES[m] and MOVE_VALUES[m] are the tables of MOVES[MOVE_IDS[m]]
+MOVE_SOURCES = np.stack([MOVES[move_id].sources for move_id in MOVE_IDS])
+MOVE_VALUES = np.stack([MOVES[move_id].values for move_id in MOVE_IDS])
+
+
+def solved_states(n: int = 1) -> np.ndarray:
+    """Return an (n, 16) batch of solved states."""
+    return np.tile((np.arange(NUM_PIECES) * NUM_ORIENTATIONS).astype(STATE_DTYPE), (n, 1))
+
+
+def apply(states: np.ndarray, move: PieceMove) -> np.ndarray:
+    return move.values[np.arange(NUM_PIECES), states[..., move.sources]]
+
+
+def apply_move(states: np.ndarray, move_id: str) -> np.ndarray:
+    return apply(states, MOVES[move_id])
+
+
+def apply_moves(states: np.ndarray, move_ids: list[str]) -> np.ndarray:
+    """Apply a sequence of moves. The moves are composed first, so the batch is permuted only once."""
+    return apply(states, compose(*(MOVES[move_id] for move_id in move_ids)))
+
+
+def apply_move_indices(states: np.ndarray, move_indices: np.ndarray) -> np.ndarray:
+    """Apply a different move to every state of an (N, 16) batch; move_indices holds N indices into MOVE_IDS."""
+    gathered = np.take_along_axis(states, MOVE_SOURCES[move_indices], axis=1)
+    return MOVE_VALUES[move_indices[:, None], np.arange(NUM_PIECES), gathered]
+
+
+def is_solved(states: np.ndarray) -> np.ndarray | bool:
+    return np.all(states == solved_states()[0], axis=-1)
+
+
+def pieces_and_orientations(states: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    return np.divmod(states, NUM_ORIENTATIONS)
+
+
+def _face_table() -> np.ndarray:
+    """_FACE_TABLE[v, p, a]: the face of the sticker along axis a at position p with value v."""
+    table = np.empty((NUM_VALUES, NUM_PIECES, len(AXES)), dtype=np.uint8)
+    for value, position in itertools.product(range(NUM_VALUES), range(NUM_PIECES)):
+        piece, orientation = divmod(value, NUM_ORIENTATIONS)
+        sigma = EVEN_PERMUTATIONS[orientation]
+        if (bin(piece).count("1") + bin(position).count("1")) % 2:
+            sigma = sigma[_SWAP]
+        for home_axis, axis in enumerate(sigma):
+            table[value, position, axis] = 2 * home_axis + ((piece >> home_axis) & 1)
+    return table
+
+
+_FACE_TABLE = _face_table()
+
+
+def sticker_faces(states: np.ndarray) -> np.ndarray:
+    """The faces of the 64 stickers of a batch of states: the sticker along axis a at position p is at index 4 * p + a,
+    and the face along axis a on side s is 2 * a + s (so the solved state shows face 2 * a + bit a of p there)."""
+    states = np.atleast_2d(states)
+    return _FACE_TABLE[states, np.arange(NUM_PIECES)].reshape(states.shape[0], -1)
@@ -0,0 +1,40 @@
+# Uniformly random scrambles. Instead of random move sequences (which are biased towards states close to the solved one,
+# unless they are very long), a random state index is drawn and decoded; every valid state has exactly one index.
+
+from puzzle_state import MOVE_NAMES, INVERSE_MOVES
+from coordinates import NUM_STATES, INDEX_DTYPE, states_from_indices
+from solver import Solver
+
+import argparse
+import numpy as np
+
+
+def random_indices(n: int, rng: np.random.Generator | None = None) -> np.ndarray:
+    """Draw n uniformly random state indices (4 bytes each)."""
+    rng = rng or np.random.default_rng()
+    return rng.integers(0, NUM_STATES, size=n, dtype=INDEX_DTYPE)
+
+
+def random_states(n: int, rng: np.random.Generator | None = None) -> np.ndarray:
+    """Draw an (n, 24) batch of uniformly random sticker states."""
+    return states_from_indices(random_indices(n, rng))
+
+
+def scramble_sequences(indices: np.ndarray, solver: Solver) -> list[list[str]]:
+    """Return the shortest move sequences that lead from the solved state to the given states: the inverted solutions."""
+    return [[INVERSE_MOVES[move_id] for move_id in reversed(solution)] for solution in solver.solve_indices(indices)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Print uniformly random scrambles of the 2D Hedgehog.")
+    parser.add_argument("count", type=int, nargs="?", default=1, help="number of scrambles")
+    parser.add_argument("--seed", type=int, default=None, help="random seed, for reproducible scrambles")
+    args = parser.parse_args()
+
+    indices = random_indices(args.count, np.random.default_rng(args.seed))
+    for sequence in scramble_sequences(indices, Solver()):
+        print(" ".join(MOVE_NAMES[move_id] for move_id in sequence))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+from constants import SESSION_CHECKPOINT_INTERVAL
+from puzzle_state import NUM_STICKERS, STATE_DTYPE, MOVE_PERMUTATIONS, solved_states, to_colors, is_solved
+from move_compiler import NUM_SLOTS, TILE_TRANSFORMS
+
+import argparse
+import os
+import time
+import numpy as np
+
+# A compact binary log of the moves of a session, and a replay engine to scrub through it quickly.
+#
+# Log format: the magic and version, followed by one record per move: a one-byte move code (the index of the move in
+# SESSION_MOVES), and the time elapsed since the previous move in milliseconds, as an unsigned LEB128 varint
+# (one byte below 128 ms, two bytes below 16 seconds), so a typical move takes 2-3 bytes.
+# A log can hold several sessions: a continued log gets a Reset record first, as every session starts from the solved state.
+LOG_MAGIC = b"HHSL"
+LOG_VERSION = 1
+SESSION_MOVES = ("x", "xp", "L", "Lp", "R", "Rp", "U2", "D2", "F2", "B2", "y", "yp", "ya", "yb", "Reset")
+_MOVE_CODES = {move_id: code for code, move_id in enumerate(SESSION_MOVES)}
+
+
+def _encode_varint(value: int) -> bytes:
+    encoded = bytearray()
+    while True:
+        byte, value = value & 0x7F, value >> 7
+        encoded.append(byte | (0x80 if value else 0))
+        if not value:
+            return bytes(encoded)
+
+
+class SessionLog:
+    """Append the moves of a session to a log file; a new file gets the header, an existing one is continued
+    after a Reset record."""
+    def __init__(self, path: str):
+        is_new = not os.path.exists(path) or os.path.getsize(path) == 0
+        if not is_new:
+            with open(path, "rb") as f:
+                _, _, end = _parse_records(f.read(), path)
+            # a record cut off by a crash would swallow the first bytes of the next one
+            os.truncate(path, end)
+        self._file = open(path, "ab")
+        self._last_time = time.monotonic()
+        if is_new:
+            self._file.write(LOG_MAGIC + bytes([LOG_VERSION]))
+        else:
+            self.record("Reset", self._last_time)
+
+    def record(self, move_id: str, timestamp: float | None = None):
+        """Append a move (a button id); the timestamp is in seconds, by default the current time."""
+        timestamp = time.monotonic() if timestamp is None else timestamp
+        delta = max(0, round((timestamp - self._last_time) * 1000))
+        self._last_time = timestamp
+        self._file.write(bytes([_MOVE_CODES[move_id]]) + _encode_varint(delta))
+        # a move is rare compared to the frames, so the log is always complete on disk, even if the application crashes
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+def _parse_records(data: bytes, path: str) -> tuple[list[str], list[int], int]:
+    """Parse the records of a log: return the moves, the time deltas in milliseconds, and the end of the last complete
+    record. If the application crashed while writing a record, the incomplete record at the end is ignored."""
+    if data[:len(LOG_MAGIC) + 1] != LOG_MAGIC + bytes([LOG_VERSION]):
+        raise ValueError(f"Not a session log: {path}")
+    move_ids, deltas = [], []
+    position = len(LOG_MAGIC) + 1
+    while position < len(data):
+        if data[position] >= len(SESSION_MOVES):
+            raise ValueError(f"Unknown move code {data[position]} at byte {position} of the session log: {path}")
+        delta, shift, end = 0, 0, position + 1
+        while end < len(data) and data[end] & 0x80:
+            delta |= (data[end] & 0x7F) << shift
+            shift += 7
+            end += 1
+        if end == len(data):
+            break  # the varint of the time is cut off
+        delta |= data[end] << shift
+        move_ids.append(SESSION_MOVES[data[position]])
+        deltas.append(delta)
+        position = end + 1
+    return move_ids, deltas, position
+
+
+def read_session_log(path: str) -> tuple[list[str], np.ndarray]:
+    """Read a log: return the moves (button ids) and their times in seconds from the start of the session."""
+    with open(path, "rb") as f:
+        move_ids, deltas, _ = _parse_records(f.read(), path)
+    return move_ids, np.cumsum(deltas, dtype=np.int64) / 1000.0
+
+
+class SessionState:
+    """The state of the application after some moves: the stickers of Model3D (like puzzle_state.py), the grid slot
+    and the target angle of each tile, and whether the first half of a split gyro move is done (only yb is active)."""
+    def __init__(self, stickers: np.ndarray, slots: np.ndarray, angles: np.ndarray, is_gyro_split: bool):
+        self.stickers = stickers
+        self.slots = slots
+        self.angles = angles
+        self.is_gyro_split = is_gyro_split
+
+    @classmethod
+    def initial(cls) -> "SessionState":
+        return cls(solved_states()[0], np.arange(NUM_SLOTS), np.zeros(NUM_SLOTS, dtype=np.int64), False)
+
+    def copy(self) -> "SessionState":
+        return SessionState(self.stickers.copy(), self.slots.copy(), self.angles.copy(), self.is_gyro_split)
+
+    def apply(self, move_id: str):
+        """Apply a move in place, without any animation."""
+        if move_id == "Reset":
+            initial = SessionState.initial()
+            self.stickers, self.slots, self.angles, self.is_gyro_split = initial.stickers, initial.slots, initial.angles, False
+            return
+        self.stickers = self.stickers[MOVE_PERMUTATIONS[move_id]]
+        transform = TILE_TRANSFORMS[move_id]
+        self.angles = (self.angles + transform.angle_deltas[self.slots]) % 360
+        self.slots = transform.destinations[self.slots]
+        if move_id in ("ya", "yb"):
+            self.is_gyro_split = not self.is_gyro_split
+
+
+class SessionReplay:
+    """Rebuild the state of the application after any number of moves of a session. The states after every
+    checkpoint_interval moves are computed once, in a single pass over the log, so seeking to move n replays
+    at most checkpoint_interval - 1 moves from the nearest checkpoint before it."""
+    def __init__(self, move_ids: list[str], times: np.ndarray | None = None, checkpoint_interval=SESSION_CHECKPOINT_INTERVAL):
+        self.move_ids = list(move_ids)
+        self.times = np.zeros(len(self.move_ids)) if times is None else np.asarray(times)
+        self.checkpoint_interval = checkpoint_interval
+
+        num_checkpoints = len(self.move_ids) // checkpoint_interval + 1
+        self.checkpoint_stickers = np.empty((num_checkpoints, NUM_STICKERS), dtype=STATE_DTYPE)
+        self.checkpoint_slots = np.empty((num_checkpoints, NUM_SLOTS), dtype=np.int64)
+        self.checkpoint_angles = np.empty((num_checkpoints, NUM_SLOTS), dtype=np.int64)
+        self.checkpoint_gyro_splits = np.empty(num_checkpoints, dtype=bool)
+        state = SessionState.initial()
+        for move in range(len(self.move_ids) + 1):
+            if move % checkpoint_interval == 0:
+                self._store_checkpoint(move // checkpoint_interval, state)
+            if move < len(self.move_ids):
+                state.apply(self.move_ids[move])
+
+    @classmethod
+    def from_file(cls, path: str, checkpoint_interval=SESSION_CHECKPOINT_INTERVAL) -> "SessionReplay":
+        move_ids, times = read_session_log(path)
+        return cls(move_ids, times, checkpoint_interval)
+
+    def __len__(self):
+        return len(self.move_ids)
+
+    def _store_checkpoint(self, checkpoint: int, state: SessionState):
+        self.checkpoint_stickers[checkpoint] = state.stickers
+        self.checkpoint_slots[checkpoint] = state.slots
+        self.checkpoint_angles[checkpoint] = state.angles
+        self.checkpoint_gyro_splits[checkpoint] = state.is_gyro_split
+
+    def state_after(self, num_moves: int) -> SessionState:
+        """The state after the first num_moves moves."""
+        if not 0 <= num_moves <= len(self.move_ids):
+            raise IndexError(f"The session has {len(self.move_ids)} moves")
+        checkpoint = num_moves // self.checkpoint_interval
+        state = SessionState(self.checkpoint_stickers[checkpoint].copy(), self.checkpoint_slots[checkpoint].copy(),
+                             self.checkpoint_angles[checkpoint].copy(), bool(self.checkpoint_gyro_splits[checkpoint]))
+        for move_id in self.move_ids[checkpoint * self.checkpoint_interval:num_moves]:
+            state.apply(move_id)
+        return state
+
+    def moves_until(self, seconds: float) -> int:
+        """The number of moves done in the first given seconds of the session."""
+        return int(np.searchsorted(self.times, seconds, side="right"))
+
+    def seek(self, hedgehog, num_moves: int):
+        """Show the state after the first num_moves moves in a Hedgehog2D application, without animation."""
+        state = self.state_after(num_moves)
+        hedgehog.scheduler.clear()
+        hedgehog.model3d.sticker_colors = to_colors(state.stickers)
+        tiles = range(hedgehog.animator.num_tiles)
+        hedgehog.animator.set_grid_positions(tiles, [divmod(slot, hedgehog.animator.cols) for slot in state.slots.tolist()])
+        hedgehog.animator.set_target_angles(tiles, state.angles.tolist())
+        hedgehog.animator.finish_tracks()
+        for button in hedgehog.buttons.values():
+            if button.text != "Reset":
+                button.is_active = (button.text == "y (gyro) 2/2") == state.is_gyro_split
+        hedgehog.invalidate()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a session log of the 2D Hedgehog.")
+    parser.add_argument("path", help="the session log")
+    parser.add_argument("--seek", type=int, default=None, help="show the state after this many moves (default: all)")
+    args = parser.parse_args()
+
+    replay = SessionReplay.from_file(args.path)
+    duration = replay.times[-1] if len(replay) else 0.0
+    print(f"{len(replay)} moves in {duration:.1f} seconds")
+    num_moves = len(replay) if args.seek is None else args.seek
+    state = replay.state_after(num_moves)
+    print(f"After {num_moves} moves the puzzle is {'solved' if is_solved(state.stickers) else 'not solved'}")
+    print(f"Tile slots: {state.slots.tolist()}, angles: {state.angles.tolist()}")
+
+
+if __name__ == "__main__":
+    main()
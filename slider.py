@@ -32,6 +32,11 @@ class Slider:
         value = self.min_val + ratio * (self.max_val - self.min_val)
         return int(value)
 
+    def set_value(self, value):
+        """Set the slider value, and move the knob to it"""
+        self.value = max(self.min_val, min(self.max_val, value))
+        self.knob_x = self._value_to_pos(self.value)
+
     def handle_event(self, event):
         if event.type == pygame.MOUSEBUTTONDOWN:
             mx, my = event.pos
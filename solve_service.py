@@ -0,0 +1,194 @@
+from constants import SOLVE_SERVICE_CACHE_SIZE, SOLVE_SERVICE_CHUNK_SIZE
+from puzzle_state import NUM_STICKERS, MOVE_NAMES, solved_states, apply_moves, to_colors
+from coordinates import state_indices, states_from_colors
+from symmetry import canonical_indices, map_solution
+from move_compiler import parse_moves
+from solver import Solver
+
+import argparse
+import collections
+import json
+import multiprocessing
+import os
+import socketserver
+import sys
+import threading
+import numpy as np
+
+# A long-running, headless solve service. Requests and responses are JSON objects, one per line, read from stdin
+# (answers to stdout), or from the clients of a local TCP or Unix socket. A request holds a batch of puzzles, in one of
+# three forms:
+#   {"id": 1, "states": [[24 sticker indices], ...]}         (the puzzle_state.py layout)
+#   {"id": 2, "colors": [[24 RGB colors], ...]}               (like Model3D.sticker_colors)
+#   {"id": 3, "moves": ["R U2 x'", ...]}                      (scrambles, see move_compiler.parse_moves)
+# and the response holds an optimal solution for each of them, in the order of the request:
+#   {"id": 1, "solutions": ["R' F2 ...", ...]}
+# or {"id": 1, "error": "..."} if the request is invalid.
+#
+# The solutions are cached by the canonical index of the states (see symmetry.py), so the symmetric variants of a state
+# share one entry. The missing states are solved by a pool of processes; every worker memory-maps the same distance
+# table file, so the tables are shared by the operating system, and no worker builds its own copy.
+
+_solver = None
+
+
+def _init_worker():
+    global _solver
+    _solver = Solver()
+
+
+def _solve_chunk(indices: np.ndarray) -> list[list[str]]:
+    return _solver.solve_indices(indices)
+
+
+def _is_list_of(value, is_item) -> bool:
+    return isinstance(value, list) and all(is_item(item) for item in value)
+
+
+def _is_index(value) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool) and 0 <= value < NUM_STICKERS
+
+
+class SolveService:
+    """Solve batches of states with a process pool, and keep the recent solutions in an LRU cache."""
+    def __init__(self, processes: int | None = None, cache_size=SOLVE_SERVICE_CACHE_SIZE, chunk_size=SOLVE_SERVICE_CHUNK_SIZE):
+        # build the tables (if needed) before the workers start, so they do not build them in parallel
+        Solver()
+        self.pool = multiprocessing.Pool(processes, initializer=_init_worker)
+        self.cache_size = cache_size
+        self.chunk_size = chunk_size
+        self.cache: collections.OrderedDict[int, tuple[str, ...]] = collections.OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self._lock = threading.Lock()
+
+    def close(self):
+        self.pool.close()
+        self.pool.join()
+
+    def solve_states(self, states: np.ndarray) -> list[list[str]]:
+        """Return an optimal solution (as button ids) for every state of an (N, 24) batch."""
+        canonical, symmetries = canonical_indices(state_indices(states))
+        canonical_solutions = {}
+        with self._lock:
+            for index in canonical.tolist():
+                if index in self.cache:
+                    self.cache.move_to_end(index)
+                    canonical_solutions[index] = self.cache[index]
+                    self.cache_hits += 1
+                else:
+                    self.cache_misses += 1
+        missing = np.array(sorted(set(canonical.tolist()) - canonical_solutions.keys()), dtype=np.int64)
+        if missing.size:
+            chunks = [missing[i:i + self.chunk_size] for i in range(0, missing.size, self.chunk_size)]
+            for chunk, solutions in zip(chunks, self.pool.map(_solve_chunk, chunks)):
+                canonical_solutions.update(zip(chunk.tolist(), map(tuple, solutions)))
+            with self._lock:
+                for index in missing.tolist():
+                    self.cache[index] = canonical_solutions[index]
+                while len(self.cache) > self.cache_size:
+                    self.cache.popitem(last=False)
+        return [map_solution(list(canonical_solutions[index]), symmetry)
+                for index, symmetry in zip(canonical.tolist(), symmetries.tolist())]
+
+    def handle_request(self, request: dict) -> dict:
+        """Answer a decoded request (see the top of the file)."""
+        response = {"id": request.get("id")} if isinstance(request, dict) else {"id": None}
+        try:
+            if not isinstance(request, dict):
+                raise ValueError("A request must be a JSON object")
+            if "states" in request:
+                if not _is_list_of(request["states"], lambda state: _is_list_of(state, _is_index)):
+                    raise ValueError(f'"states" must be a list of lists of sticker indices (0-{NUM_STICKERS - 1})')
+                states = np.array(request["states"], dtype=np.int64)
+                if states.ndim != 2 or states.shape[1] != NUM_STICKERS or not np.array_equal(np.sort(states, axis=1), solved_states(len(states))):
+                    raise ValueError(f"A state must be a permutation of the {NUM_STICKERS} sticker indices")
+                # a reachable state is the only state with its colors
+                if not np.array_equal(states_from_colors([to_colors(state) for state in states]), states):
+                    raise ValueError("Unreachable state")
+            elif "colors" in request:
+                if not _is_list_of(request["colors"], lambda colors: isinstance(colors, list)):
+                    raise ValueError('"colors" must be a list of lists of RGB colors')
+                states = states_from_colors(request["colors"])
+            elif "moves" in request:
+                if not _is_list_of(request["moves"], lambda moves: isinstance(moves, str)):
+                    raise ValueError('"moves" must be a list of move strings')
+                states = np.concatenate([apply_moves(solved_states(), parse_moves(moves)) for moves in request["moves"]]) \
+                    if request["moves"] else solved_states(0)
+            else:
+                raise ValueError('A request needs "states", "colors" or "moves"')
+            if len(states) == 0:
+                response["solutions"] = []
+            else:
+                response["solutions"] = [" ".join(MOVE_NAMES[move_id] for move_id in solution)
+                                         for solution in self.solve_states(states)]
+        except (ValueError, TypeError) as error:
+            response["error"] = str(error)
+        except Exception as error:
+            # an unexpected error fails only this request, not the service (or the connection of the client)
+            response["error"] = f"{type(error).__name__}: {error}"
+        return response
+
+    def handle_line(self, line: str) -> str:
+        try:
+            request = json.loads(line)
+        except json.JSONDecodeError as error:
+            return json.dumps({"id": None, "error": f"Invalid JSON: {error}"})
+        return json.dumps(self.handle_request(request))
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """Answer the requests of a socket client, line by line, until it disconnects."""
+    def handle(self):
+        for line in self.rfile:
+            if line.strip():
+                self.wfile.write((self.server.service.handle_line(line.decode()) + "\n").encode())
+
+
+class _TCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def serve_stdin(service: SolveService):
+    for line in sys.stdin:
+        if line.strip():
+            print(service.handle_line(line), flush=True)
+
+
+def serve_socket(service: SolveService, tcp: str | None = None, unix: str | None = None):
+    if unix is not None:
+        if os.path.exists(unix):
+            os.remove(unix)
+        server = socketserver.ThreadingUnixStreamServer(unix, _RequestHandler)
+        server.daemon_threads = True
+    else:
+        host, port = tcp.rsplit(":", 1)
+        server = _TCPServer((host, int(port)), _RequestHandler)
+    server.service = service
+    with server:
+        server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Solve batches of 2D Hedgehog states, read as JSON lines from stdin or from a socket.")
+    parser.add_argument("--tcp", default=None, metavar="HOST:PORT", help="listen on a TCP socket, like 127.0.0.1:7777")
+    parser.add_argument("--unix", default=None, metavar="PATH", help="listen on a Unix socket")
+    parser.add_argument("--processes", type=int, default=None, help="number of worker processes (default: all CPUs)")
+    parser.add_argument("--cache-size", type=int, default=SOLVE_SERVICE_CACHE_SIZE, help="number of cached solutions")
+    args = parser.parse_args()
+
+    service = SolveService(args.processes, args.cache_size)
+    try:
+        if args.tcp is None and args.unix is None:
+            serve_stdin(service)
+        else:
+            serve_socket(service, args.tcp, args.unix)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+from constants import DISTANCE_TABLE_PATH
+from puzzle_state import MOVE_IDS
+from coordinates import NUM_PERMUTATIONS, NUM_TWISTS, NUM_STATES, build_move_tables, state_indices
+
+import os
+import numpy as np
+
+# The distance table stores the distance of every state from the solved state modulo 3, packed into 2 bits per state (about 22 MB).
+# This is enough to find an optimal solution: every move changes the distance by at most one, so from a state with
+# distance d, a move leading to a state with distance (d - 1) mod 3 is always a step on a shortest path.
+#
+# File layout (little endian): 16 byte header (magic, format version, number of moves, unused), then the permutation
+# and twist move tables (uint16), and finally the packed distance table. Everything is memory-mapped on load.
+TABLE_MAGIC = b"HHDT"
+TABLE_VERSION = 2
+_HEADER = np.dtype([("magic", "S4"), ("version", "<u4"), ("num_moves", "<u4"), ("unused", "<u4")])
+
+_UNVISITED = 255
+_BFS_CHUNK_SIZE = 1 << 22  # number of frontier states expanded at once; bounds the memory used by the temporary arrays
+
+
+def build_distance_table(path: str = DISTANCE_TABLE_PATH, verbose: bool = False):
+    """Run a breadth-first search over all states from the solved state, and write the tables to the given file."""
+    permutation_table, twist_table = build_move_tables()
+    permutation_table_wide = permutation_table.astype(np.int64) * NUM_TWISTS
+    depths = np.full(NUM_STATES, _UNVISITED, dtype=np.uint8)
+    depths[0] = 0
+    depth = 0
+    while True:
+        frontier = np.flatnonzero(depths == depth)
+        if frontier.size == 0:
+            break
+        if verbose:
+            print(f"depth {depth}: {frontier.size} states")
+        for start in range(0, frontier.size, _BFS_CHUNK_SIZE):
+            permutations, twists = np.divmod(frontier[start:start + _BFS_CHUNK_SIZE], NUM_TWISTS)
+            for m in range(len(MOVE_IDS)):
+                neighbors = permutation_table_wide[permutations, m] + twist_table[twists, m]
+                neighbors = neighbors[depths[neighbors] == _UNVISITED]
+                depths[neighbors] = depth + 1
+        depth += 1
+
+    # pack four 2-bit distances into every byte
+    distances = (depths % 3).reshape(-1, 4)
+    packed = distances[:, 0] | (distances[:, 1] << 2) | (distances[:, 2] << 4) | (distances[:, 3] << 6)
+
+    header = np.zeros(1, dtype=_HEADER)
+    header["magic"], header["version"], header["num_moves"] = TABLE_MAGIC, TABLE_VERSION, len(MOVE_IDS)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    # write to a temporary file first, so that other processes never map a half-written table
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "wb") as f:
+        for array in (header, permutation_table.astype("<u2"), twist_table.astype("<u2"), packed):
+            f.write(array.tobytes())
+    os.replace(temp_path, path)
+
+
+def _table_file_size() -> int:
+    """The size of a complete table file: the header, the two move tables and the packed distance table."""
+    return _HEADER.itemsize + 2 * (NUM_PERMUTATIONS + NUM_TWISTS) * len(MOVE_IDS) + NUM_STATES // 4
+
+
+class Solver:
+    """Optimal solver for the Hedgehog move set (x, x', L, L', R, R', U2, D2, F2, B2, y, y').
+    The tables are built once and written to disk (this takes less than a minute); later they are only memory-mapped,
+    so creating a solver is cheap, and processes using the same file share its memory."""
+    def __init__(self, path: str = DISTANCE_TABLE_PATH):
+        if not self._is_valid_table_file(path):
+            build_distance_table(path)
+        offset = _HEADER.itemsize
+        num_moves = len(MOVE_IDS)
+        self.permutation_table = np.memmap(path, dtype="<u2", mode="r", offset=offset, shape=(NUM_PERMUTATIONS, num_moves))
+        offset += self.permutation_table.nbytes
+        self.twist_table = np.memmap(path, dtype="<u2", mode="r", offset=offset, shape=(NUM_TWISTS, num_moves))
+        offset += self.twist_table.nbytes
+        self.distance_table = np.memmap(path, dtype=np.uint8, mode="r", offset=offset, shape=(NUM_STATES // 4,))
+
+    @staticmethod
+    def _is_valid_table_file(path: str) -> bool:
+        # a file of a different size is truncated (or from another layout), and would be misread by np.memmap
+        if not os.path.exists(path) or os.path.getsize(path) != _table_file_size():
+            return False
+        header = np.fromfile(path, dtype=_HEADER, count=1)
+        return header.size == 1 and header["magic"][0] == TABLE_MAGIC and header["version"][0] == TABLE_VERSION \
+            and header["num_moves"][0] == len(MOVE_IDS)
+
+    def _distances_mod3(self, indices: np.ndarray) -> np.ndarray:
+        return (self.distance_table[indices >> 2] >> ((indices & 3) << 1).astype(np.uint8)) & 3
+
+    def _neighbors(self, indices: np.ndarray) -> np.ndarray:
+        """Return the (N, number of moves) array of the neighbor state indices."""
+        permutations, twists = np.divmod(indices, NUM_TWISTS)
+        return self.permutation_table[permutations].astype(np.int64) * NUM_TWISTS + self.twist_table[twists]
+
+    def solve_indices(self, indices: np.ndarray) -> list[list[str]]:
+        """Find an optimal solution for every state index of the batch. All the states descend towards
+        the solved state together, one move per step."""
+        indices = np.array(indices, dtype=np.int64).reshape(-1)
+        solutions = [[] for _ in range(indices.size)]
+        active = np.flatnonzero(indices != 0)
+        current = indices[active]
+        while active.size > 0:
+            neighbors = self._neighbors(current)
+            wanted = (self._distances_mod3(current) + 2) % 3
+            # the first move that gets one step closer; there is always at least one
+            moves = np.argmax(self._distances_mod3(neighbors) == wanted[:, None], axis=1)
+            current = neighbors[np.arange(current.size), moves]
+            for i, m in zip(active, moves):
+                solutions[i].append(MOVE_IDS[m])
+            unsolved = current != 0
+            active, current = active[unsolved], current[unsolved]
+        return solutions
+
+    def solve_states(self, states: np.ndarray) -> list[list[str]]:
+        """Find an optimal solution for a batch of sticker states (see puzzle_state.py)."""
+        return self.solve_indices(state_indices(states))
+
+    def solve(self, state: np.ndarray) -> list[str]:
+        """Return a shortest move sequence (as Hedgehog2D button ids) that brings a single state to the solved state."""
+        return self.solve_states(state)[0]
+
+    def distances(self, states: np.ndarray) -> np.ndarray:
+        return np.array([len(solution) for solution in self.solve_states(states)])
+
+
+if __name__ == "__main__":
+    build_distance_table(verbose=True)
@@ -0,0 +1,84 @@
+from constants import ROTATION_CACHE_ANGLE_STEP, ROTATION_CACHE_MEMORY_BUDGET
+
+from collections import OrderedDict
+import pygame
+
+class MemoryBudget:
+    """A memory budget shared by several rotation caches (for example, the caches of all the tiles). When the cached
+    surfaces of all of them use more than `memory_budget` bytes, the least recently used ones are evicted, from any cache."""
+    def __init__(self, memory_budget=ROTATION_CACHE_MEMORY_BUDGET):
+        self.memory_budget = memory_budget
+        self.memory_used = 0
+        # (cache id, quantized angle step) -> (cache, surface size), in least recently used order
+        self._entries: OrderedDict[tuple[int, int], tuple["RotationCache", int]] = OrderedDict()
+
+    def is_full(self) -> bool:
+        return self.memory_used >= self.memory_budget
+
+    def touch(self, cache: "RotationCache", step: int):
+        self._entries.move_to_end((id(cache), step))
+
+    def add(self, cache: "RotationCache", step: int, size: int):
+        self._entries[(id(cache), step)] = (cache, size)
+        self.memory_used += size
+        # evict the least recently used surfaces, but always keep the one just added
+        while self.memory_used > self.memory_budget and len(self._entries) > 1:
+            (_, evicted_step), (evicted_cache, evicted_size) = self._entries.popitem(last=False)
+            del evicted_cache._surfaces[evicted_step]
+            self.memory_used -= evicted_size
+
+    def remove(self, cache: "RotationCache", step: int):
+        _, size = self._entries.pop((id(cache), step))
+        self.memory_used -= size
+
+
+class RotationCache:
+    """A cache of the rotated versions of an image. Angles are quantized to `angle_step` degrees, and the rotated surfaces
+    are rendered lazily (or in advance with prerender). The memory used by the cached surfaces is limited by a budget,
+    which can be shared with other caches."""
+    def __init__(self, image: pygame.surface.Surface, angle_step=ROTATION_CACHE_ANGLE_STEP, budget: MemoryBudget | None = None):
+        self.image = image
+        self.angle_step = angle_step
+        self.num_steps = round(360 / angle_step)
+        self.budget = budget if budget is not None else MemoryBudget()
+        self._surfaces: dict[int, pygame.surface.Surface] = {}  # quantized angle step -> rotated surface
+
+    def _quantize(self, angle: float) -> int:
+        return round(angle / self.angle_step) % self.num_steps
+
+    @staticmethod
+    def _surface_size(surface: pygame.surface.Surface) -> int:
+        return surface.get_width() * surface.get_height() * surface.get_bytesize()
+
+    def get(self, angle: float) -> pygame.surface.Surface:
+        """Return the image rotated clockwise by the given angle in degrees (the same as pygame.transform.rotate(image, -angle))."""
+        step = self._quantize(angle)
+        surface = self._surfaces.get(step)
+        if surface is not None:
+            self.budget.touch(self, step)
+            return surface
+
+        surface = pygame.transform.rotate(self.image, -step * self.angle_step)
+        self._store(step, surface)
+        return surface
+
+    def put(self, angle: float, surface: pygame.surface.Surface):
+        """Add an already rotated surface (for example, from the tile atlas) to the cache."""
+        step = self._quantize(angle)
+        if step in self._surfaces:
+            del self._surfaces[step]
+            self.budget.remove(self, step)
+        self._store(step, surface)
+
+    def _store(self, step: int, surface: pygame.surface.Surface):
+        self._surfaces[step] = surface
+        self.budget.add(self, step, self._surface_size(surface))
+
+    def prerender(self, angles):
+        """Render the given angles in advance, as long as they fit into the memory budget."""
+        for angle in angles:
+            if self._quantize(angle) in self._surfaces:
+                continue
+            self.get(angle)
+            if self.budget.is_full():
+                break
@@ -0,0 +1,160 @@
+from constants import STATE_CACHE_PATH, STATE_CACHE_MAX_ENTRIES, STATE_CACHE_MAX_FILE_SIZE
+from puzzle_state import MOVE_IDS
+from coordinates import state_indices, states_from_colors
+from symmetry import canonical_indices, conjugation_tables, map_solution
+from solver import Solver
+
+from collections import OrderedDict
+import os
+import struct
+import numpy as np
+
+# A persistent cache of the analysis of states: the distance from the solved state, an optimal solution, and the
+# canonical form. The key is the canonical state index (see symmetry.py): 4 bytes, shared by the symmetric states, and
+# computed from the sticker colors of Model3D as well. Only the solution of the canonical state is stored; the solution
+# of any other state is mapped from it.
+#
+# File format: the magic and version, followed by the records: the canonical index (uint32, little-endian), the length
+# of the solution (uint8), and the solution as indices into MOVE_IDS (one byte per move). The file is append-only; when
+# it grows over the disk budget, it is rewritten with the entries in memory, and replaced atomically.
+# One process writes the file; other processes can open it read-only: refresh loads the records appended since the last load.
+CACHE_MAGIC = b"HHSC"
+CACHE_VERSION = 1
+_RECORD_HEADER = struct.Struct("<IB")
+_MOVE_CODES = {move_id: code for code, move_id in enumerate(MOVE_IDS)}
+
+
+class StateAnalysis:
+    """The analysis of a state: its distance from the solved state, an optimal solution (button ids), and its canonical index."""
+    def __init__(self, solution: list[str], canonical_index: int):
+        self.solution = solution
+        self.distance = len(solution)
+        self.canonical_index = canonical_index
+
+
+class StateCache:
+    """The analysis cache. The entries live in memory in least recently used order, up to max_entries; the file
+    keeps them across restarts. A read-only cache never writes the file, and only computes the missing entries."""
+    def __init__(self, path=STATE_CACHE_PATH, read_only=False, max_entries=STATE_CACHE_MAX_ENTRIES, max_file_size=STATE_CACHE_MAX_FILE_SIZE):
+        self.path = path
+        self.read_only = read_only
+        self.max_entries = max_entries
+        self.max_file_size = max_file_size
+        self.entries: OrderedDict[int, bytes] = OrderedDict()  # canonical index -> solution as move codes
+        self._solver: Solver | None = None  # created by load_solver, or at the first miss, as it may have to build its tables
+        self._file = None
+        self._loaded_size = 0  # the file is loaded up to this offset
+        self._loaded_inode = None
+        if not read_only:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            if not os.path.exists(path) or os.path.getsize(path) == 0:
+                with open(path, "wb") as f:
+                    f.write(CACHE_MAGIC + bytes([CACHE_VERSION]))
+        self.refresh()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def refresh(self):
+        """Load the records appended to the file since the last load; reload everything if the file was replaced."""
+        if not os.path.exists(self.path):
+            return
+        stat = os.stat(self.path)
+        if stat.st_ino != self._loaded_inode or stat.st_size < self._loaded_size:
+            self.entries.clear()
+            self._loaded_size, self._loaded_inode = 0, stat.st_ino
+            self.close()
+        with open(self.path, "rb") as f:
+            if self._loaded_size == 0:
+                header = f.read(len(CACHE_MAGIC) + 1)
+                if header != CACHE_MAGIC + bytes([CACHE_VERSION]):
+                    raise ValueError(f"Not a state cache: {self.path}")
+                self._loaded_size = len(header)
+            f.seek(self._loaded_size)
+            data = f.read()
+        position = 0
+        # a record being written by another process may be incomplete; it is loaded at the next refresh
+        while position + _RECORD_HEADER.size <= len(data):
+            index, length = _RECORD_HEADER.unpack_from(data, position)
+            end = position + _RECORD_HEADER.size + length
+            if end > len(data):
+                break
+            self._remember(index, data[position + _RECORD_HEADER.size:end])
+            position = end
+        self._loaded_size += position
+
+    def _remember(self, index: int, moves: bytes):
+        self.entries[index] = moves
+        self.entries.move_to_end(index)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def _append(self, records: list[tuple[int, bytes]]):
+        if self._file is None:
+            self._file = open(self.path, "ab")
+        self._file.write(b"".join(_RECORD_HEADER.pack(index, len(moves)) + moves for index, moves in records))
+        self._file.flush()
+        self._loaded_size = self._file.tell()
+        if self._loaded_size > self.max_file_size:
+            self.compact()
+
+    def compact(self):
+        """Rewrite the file with the entries in memory, keeping it within half of the disk budget, so that it is not
+        rewritten again after every few appends. The least recently used entries are dropped first."""
+        size = len(CACHE_MAGIC) + 1 + sum(_RECORD_HEADER.size + len(moves) for moves in self.entries.values())
+        while size > self.max_file_size // 2 and self.entries:
+            _, moves = self.entries.popitem(last=False)
+            size -= _RECORD_HEADER.size + len(moves)
+        self.close()
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(CACHE_MAGIC + bytes([CACHE_VERSION]))
+            f.write(b"".join(_RECORD_HEADER.pack(index, len(moves)) + moves for index, moves in self.entries.items()))
+        os.replace(temp_path, self.path)
+        self._loaded_size, self._loaded_inode = os.path.getsize(self.path), os.stat(self.path).st_ino
+
+    def load_solver(self):
+        """Create the solver, building its tables if needed (this can take up to a minute), and the symmetry tables;
+        it can run in a background thread, as long as the cache is not used for a miss in the meantime (see is_solver_loaded)."""
+        if self._solver is None:
+            conjugation_tables()
+            self._solver = Solver()
+
+    def is_solver_loaded(self) -> bool:
+        return self._solver is not None
+
+    def _solve(self, indices: list[int]) -> list[bytes]:
+        self.load_solver()
+        return [bytes(_MOVE_CODES[move_id] for move_id in solution) for solution in self._solver.solve_indices(indices)]
+
+    def analyze_indices(self, indices: np.ndarray) -> list[StateAnalysis]:
+        """Analyze a batch of state indices; the missing entries are solved together, and appended to the file."""
+        canonical, symmetries = canonical_indices(indices)
+        canonical = canonical.tolist()
+        missing = sorted({index for index in canonical if index not in self.entries})
+        if missing:
+            records = list(zip(missing, self._solve(missing)))
+            for index, moves in records:
+                self._remember(index, moves)
+            if not self.read_only:
+                self._append(records)
+        analyses = []
+        for index, symmetry in zip(canonical, symmetries.tolist()):
+            moves = self.entries.get(index)
+            if moves is None:
+                # a batch larger than max_entries evicts some of its own entries
+                moves = self._solve([index])[0]
+            else:
+                self.entries.move_to_end(index)
+            analyses.append(StateAnalysis(map_solution([MOVE_IDS[code] for code in moves], symmetry), index))
+        return analyses
+
+    def analyze_states(self, states: np.ndarray) -> list[StateAnalysis]:
+        """Analyze a batch of sticker states (see puzzle_state.py)."""
+        return self.analyze_indices(state_indices(states))
+
+    def analyze_colors(self, sticker_colors: list[tuple[int, int, int]]) -> StateAnalysis:
+        """Analyze a single state, given by its sticker colors (like Model3D.sticker_colors)."""
+        return self.analyze_states(states_from_colors([sticker_colors]))[0]
@@ -0,0 +1,101 @@
+from constants import STICKER_COLORS
+from puzzle_state import NUM_STICKERS, STATE_DTYPE, MOVE_IDS, MOVE_TABLE, invert
+from coordinates import CORNERS, NUM_PERMUTATIONS, NUM_TWISTS, INDEX_DTYPE, state_indices, states_from_indices
+
+import functools
+import numpy as np
+
+# Symmetries of the puzzle that keep the distance from the solved state. A symmetry is a reorientation (or a mirroring)
+# of the whole cube together with the matching recoloring of the stickers; applying it to a state is a conjugation.
+# It keeps the distance only if it maps the move set onto itself. The Hedgehog moves turn around the x axis
+# (L, R, x), the y axis (U2, D2, y) and the z axis (F2, B2), so the valid symmetries are the ones that keep all three axes:
+# the half turns x2, y2, z2, the mirrorings through the three middle planes, the central inversion, and the identity.
+# Quarter reorientations like x or y alone are not symmetries here, as they turn the y moves into z moves (and vice versa).
+
+_FACES = "UFRLBD"  # the face of sticker i is _FACES[i // 4], following STICKER_COLORS
+# the axis flips generating the symmetries: L <-> R, U <-> D, F <-> B
+_FLIPS = ({"L": "R", "R": "L"}, {"U": "D", "D": "U"}, {"F": "B", "B": "F"})
+
+assert len(STICKER_COLORS) == len(_FACES) * 4
+
+
+def _sticker_faces(sticker: int) -> tuple[str, frozenset]:
+    """Return the face of the sticker and the set of faces of its corner."""
+    corner = next(corner for corner in CORNERS if sticker in corner)
+    return _FACES[sticker // 4], frozenset(_FACES[s // 4] for s in corner)
+
+
+def _symmetry_permutation(face_map: dict[str, str]) -> np.ndarray:
+    """Build the sticker permutation of a face mapping: the sticker of position i goes to the position with the mapped faces."""
+    positions = {_sticker_faces(sticker): sticker for sticker in range(NUM_STICKERS)}
+    destination = np.empty(NUM_STICKERS, dtype=STATE_DTYPE)
+    for sticker in range(NUM_STICKERS):
+        face, corner = _sticker_faces(sticker)
+        destination[sticker] = positions[(face_map.get(face, face), frozenset(face_map.get(f, f) for f in corner))]
+    # the same convention as the move permutations: entry i tells which position moves to position i
+    return invert(destination)
+
+
+def _face_map(flip_mask: int) -> dict[str, str]:
+    face_map = {}
+    for bit, flip in enumerate(_FLIPS):
+        if flip_mask & (1 << bit):
+            face_map.update(flip)
+    return face_map
+
+
+SYMMETRIES = np.stack([_symmetry_permutation(_face_map(mask)) for mask in range(2 ** len(_FLIPS))])  # the identity is the first
+SYMMETRY_INVERSES = np.stack([invert(symmetry) for symmetry in SYMMETRIES])
+NUM_SYMMETRIES = len(SYMMETRIES)
+
+
+def _move_index(permutation: np.ndarray) -> int:
+    return int(np.flatnonzero(np.all(MOVE_TABLE == permutation, axis=1))[0])
+
+
+# MOVE_CONJUGATES[s, m]: the move that maps the solution of the conjugated state back to the original one
+MOVE_CONJUGATES = np.array([[_move_index(symmetry[move[inverse]]) for move in MOVE_TABLE]
+                            for symmetry, inverse in zip(SYMMETRIES, SYMMETRY_INVERSES)], dtype=np.uint8)
+# sanity check: every symmetry maps the move set onto itself
+assert all(sorted(row) == list(range(len(MOVE_IDS))) for row in MOVE_CONJUGATES)
+
+
+def conjugate(states: np.ndarray, symmetry: int) -> np.ndarray:
+    """Apply a symmetry to a single state or a batch of states."""
+    return SYMMETRY_INVERSES[symmetry][states[..., SYMMETRIES[symmetry]]]
+
+
+@functools.cache
+def conjugation_tables() -> tuple[np.ndarray, np.ndarray]:
+    """Build the conjugation tables on the coordinates (computed once per process, in a fraction of a second).
+    All the symmetries keep the U-D axis, so the twist of the conjugate does not depend on the permutation,
+    and the two coordinates can be conjugated independently, just like with the move tables."""
+    untwisted_states = states_from_indices(np.arange(NUM_PERMUTATIONS) * NUM_TWISTS)
+    unpermuted_states = states_from_indices(np.arange(NUM_TWISTS))
+    permutation_table = np.empty((NUM_SYMMETRIES, NUM_PERMUTATIONS), dtype=np.uint16)
+    twist_table = np.empty((NUM_SYMMETRIES, NUM_TWISTS), dtype=np.uint16)
+    for symmetry in range(NUM_SYMMETRIES):
+        permutation_table[symmetry] = state_indices(conjugate(untwisted_states, symmetry)) // NUM_TWISTS
+        twist_table[symmetry] = state_indices(conjugate(unpermuted_states, symmetry)) % NUM_TWISTS
+    return permutation_table, twist_table
+
+
+def canonical_indices(indices: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Map a batch of state indices to the smallest index among their symmetric states. Symmetric states have the same
+    distance from the solved state, so tables and caches keyed by the canonical index need roughly 8 times fewer entries.
+    Also return which symmetry gives the canonical state, to map results back with MOVE_CONJUGATES."""
+    permutation_table, twist_table = conjugation_tables()
+    permutations, twists = np.divmod(np.asarray(indices, dtype=np.int64), NUM_TWISTS)
+    conjugates = permutation_table[:, permutations].astype(np.int64) * NUM_TWISTS + twist_table[:, twists]  # (8, N)
+    symmetries = np.argmin(conjugates, axis=0)
+    return conjugates[symmetries, np.arange(symmetries.size)].astype(INDEX_DTYPE), symmetries.astype(np.uint8)
+
+
+def canonical_states(states: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """The same as canonical_indices, for a batch of sticker states."""
+    return canonical_indices(state_indices(states))
+
+
+def map_solution(solution: list[str], symmetry: int) -> list[str]:
+    """Turn a solution of the canonical state into a solution of the original state."""
+    return [MOVE_IDS[MOVE_CONJUGATES[symmetry, MOVE_IDS.index(move_id)]] for move_id in solution]
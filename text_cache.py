@@ -0,0 +1,25 @@
+from constants import TEXT_CACHE_SIZE
+
+from collections import OrderedDict
+import pygame
+
+class TextCache:
+    """A cache of rendered text surfaces, keyed by the text, the color and the font. Texts rarely change between frames
+    (for example, the speed value changes only when the slider moves), so they are rasterized only once."""
+    def __init__(self, max_entries=TEXT_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._surfaces: OrderedDict[tuple, pygame.surface.Surface] = OrderedDict()
+
+    def render(self, font: pygame.font.Font, text: str, color: tuple[int, int, int]) -> pygame.surface.Surface:
+        """The same as font.render(text, True, color), but cached."""
+        key = (text, color, font)
+        surface = self._surfaces.get(key)
+        if surface is not None:
+            self._surfaces.move_to_end(key)
+            return surface
+
+        surface = font.render(text, True, color)
+        self._surfaces[key] = surface
+        if len(self._surfaces) > self.max_entries:
+            self._surfaces.popitem(last=False)
+        return surface
@@ -0,0 +1,177 @@
+from constants import PIVOT_Y, PIVOT_L_X, PIVOT_R_X, TILE_POSITION_ADJUSTMENT, ROWS, COLS
+from constants import TURN_ANIMATION_DURATION, SLIDE_ANIMATION_DURATION, SPEED_MIN_VALUE, SPEED_MAX_VALUE
+
+import math
+import numpy as np
+
+
+def grid_pixel_positions(rows: int, cols: int) -> np.ndarray:
+    """Calculate the pixel position of every grid slot (row * cols + col). The tiles are arranged in 2x2 blocks around
+    pivot points, just like the two blocks of the 2x4 Hedgehog grid, so larger grids keep the same look."""
+    block_spacing = PIVOT_R_X - PIVOT_L_X
+    center_x = (PIVOT_L_X + PIVOT_R_X) / 2
+    block_rows, block_cols = (rows + 1) // 2, (cols + 1) // 2
+    row, col = np.divmod(np.arange(rows * cols), cols)
+    pivot_x = center_x + (col // 2 - (block_cols - 1) / 2) * block_spacing
+    pivot_y = PIVOT_Y + (row // 2 - (block_rows - 1) / 2) * block_spacing
+    # the tiles on the left (top) of the block are pulled left (up) relative to the pivot point, the others are pushed right (down)
+    x = np.where(col % 2 == 0, pivot_x - TILE_POSITION_ADJUSTMENT, pivot_x + TILE_POSITION_ADJUSTMENT)
+    y = np.where(row % 2 == 0, pivot_y - TILE_POSITION_ADJUSTMENT, pivot_y + TILE_POSITION_ADJUSTMENT)
+    return np.stack([x, y], axis=1)
+
+
+def speed_from_slider(x) -> float:
+    """Based on the slider position x (which can vary from 1 to 100), calculate the speed adjustment factor.
+    We have to transform the linear slider to a logarithmic speed scale, so that x=1 maps to SPEED_MIN_VALUE,
+    x=50 maps to 1.0, and x=100 maps to SPEED_MAX_VALUE."""
+    L = math.log(SPEED_MIN_VALUE)
+    H = math.log(SPEED_MAX_VALUE)
+    if x <= 50:
+        t = (x - 1.0) / 49.0
+        return math.exp((1.0-t)*L)
+    else:
+        t = (x - 50.0) / 50.0
+        return math.exp(t * H)
+
+
+class TileAnimator:
+    """The animation state of all the tiles of a rows x cols grid, stored as a struct of lists (one entry per tile).
+    The grid has a handful of tiles, so they are updated in plain Python loops; the overhead of a numpy call would be
+    larger than the whole scalar update of a tile.
+
+    Every turn starts an animation track for the affected tiles: a start time, a duration, the start pose and the target pose.
+    For example, during an R turn, a tile rotates around the R pivot point while moving to its new grid position;
+    and also rotates around its own center to achieve the desired final orientation. The pose of a tile is a closed-form
+    function of the animation time, so the result does not depend on the frame rate, frames can be skipped, and seeking
+    to any time costs the same as a single frame. A new turn during an ongoing one starts from the current pose.
+    """
+    def __init__(self, rows=ROWS, cols=COLS, speed_adjustment=1.0):
+        self.rows, self.cols = rows, cols
+        self.num_tiles = n = rows * cols
+        self.slot_pixel_positions = [(x, y) for x, y in grid_pixel_positions(rows, cols).tolist()]
+        self.time = 0.0  # the animation time in seconds
+
+        self.grid_slots = list(range(n))    # the grid slot (row * cols + col) of each tile
+        self.tile_at_slot = list(range(n))  # the inverse index: which tile is on each slot
+        self.current_pixel_pos = list(self.slot_pixel_positions)  # (x, y) of each tile
+        self.target_pixel_pos = list(self.current_pixel_pos)
+        self.current_angle = [0.0] * n  # the tiles' rotation angles around their center points (current)
+        self.target_angle = [0.0] * n   # the tiles' rotation angles around their center points (target)
+        self.speed_adjustment = [float(speed_adjustment)] * n  # speed multipliers coming from the slider
+
+        # the animation tracks; a track is finished if track_start + track_duration <= time
+        self.track_start = [-SLIDE_ANIMATION_DURATION] * n
+        self.track_duration = [SLIDE_ANIMATION_DURATION] * n
+        # the position at progress p is pivot_point + rotate(pivot_offset, pivot_rotation_angle * p) + position_correction * p;
+        # a tile without a pivot rotation has its start position as pivot point, and slides along position_correction
+        self.is_pivoting = [False] * n
+        self.pivot_point = list(self.current_pixel_pos)
+        self.pivot_offset = [(0.0, 0.0)] * n
+        self.pivot_rotation_angle = [0.0] * n  # the rotation angle around the pivot point
+        self.position_correction = [(0.0, 0.0)] * n
+        # the angle at progress p is start_angle + angle_delta * p
+        self.start_angle = [0.0] * n
+        self.angle_delta = [0.0] * n
+
+    def tiles_at(self, positions: list[tuple[int, int]]) -> list[int]:
+        """Return the indices of the tiles on the given (row, col) grid positions."""
+        return [self.tile_at_slot[row * self.cols + col] for row, col in positions]
+
+    def set_grid_positions(self, tiles: list[int], positions: list[tuple[int, int]]):
+        """Move the given tiles to new grid positions; the tiles slide towards their new pixel positions.
+        The new positions must be a permutation of the old positions of the tiles."""
+        for tile, (row, col) in zip(tiles, positions):
+            slot = row * self.cols + col
+            self.grid_slots[tile] = slot
+            self.tile_at_slot[slot] = tile
+            self.target_pixel_pos[tile] = self.slot_pixel_positions[slot]
+        self._start_tracks(tiles, SLIDE_ANIMATION_DURATION)
+
+    def set_target_angles(self, tiles: list[int], angles: list[float]):
+        """Rotate the given tiles around their centers to new target angles."""
+        for tile, angle in zip(tiles, angles):
+            self.target_angle[tile] = angle % 360
+        self._start_tracks(tiles, SLIDE_ANIMATION_DURATION)
+
+    def start_pivot_rotation(self, tiles: list[int], pivot_point: tuple[int, int], rotation_degree: float, target_angle_diff: float):
+        """Rotate the given tiles around the pivot point (after their new grid positions are set)."""
+        for tile in tiles:
+            self.target_angle[tile] = (self.target_angle[tile] + target_angle_diff) % 360
+        self._start_tracks(tiles, TURN_ANIMATION_DURATION, pivot_point, rotation_degree)
+
+    def _start_tracks(self, tiles: list[int], duration: float, pivot_point=None, rotation_degree=0.0):
+        """Start new animation tracks from the current poses of the tiles towards their targets."""
+        radians = math.radians(rotation_degree)
+        cos, sin = math.cos(radians), math.sin(radians)
+        for tile in tiles:
+            x, y = self.current_pixel_pos[tile]
+            pivot_x, pivot_y = (x, y) if pivot_point is None else pivot_point
+            offset_x, offset_y = x - pivot_x, y - pivot_y
+            self.track_start[tile] = self.time
+            self.track_duration[tile] = duration / self.speed_adjustment[tile]
+            self.is_pivoting[tile] = pivot_point is not None
+            self.pivot_point[tile] = (pivot_x, pivot_y)
+            self.pivot_offset[tile] = (offset_x, offset_y)
+            self.pivot_rotation_angle[tile] = rotation_degree
+            # if the tile does not start from a grid position (because a previous turn is still ongoing), the rotation alone
+            # would not reach the target, so the difference is added gradually
+            target_x, target_y = self.target_pixel_pos[tile]
+            self.position_correction[tile] = (target_x - pivot_x - offset_x * cos + offset_y * sin,
+                                              target_y - pivot_y - offset_x * sin - offset_y * cos)
+
+            # rotate the tile around its center along the shorter way; a half turn follows the direction of the pivot rotation
+            angle_diff = (self.target_angle[tile] - self.current_angle[tile]) % 360
+            if angle_diff > 180:
+                angle_diff -= 360
+            elif angle_diff == 180 and rotation_degree < 0:
+                angle_diff = -180
+            self.start_angle[tile] = self.current_angle[tile]
+            self.angle_delta[tile] = angle_diff
+
+    def update_speed(self, x):
+        """Update the speed adjustment of every tile from the slider position x.
+        The ongoing tracks keep their progress, only the rest of them gets faster or slower."""
+        speed = speed_from_slider(x)
+        for tile in range(self.num_tiles):
+            progress = (self.time - self.track_start[tile]) / self.track_duration[tile]
+            self.track_duration[tile] *= self.speed_adjustment[tile] / speed
+            self.track_start[tile] = self.time - progress * self.track_duration[tile]
+            self.speed_adjustment[tile] = speed
+
+    def is_animating(self) -> list[bool]:
+        return [start + duration > self.time for start, duration in zip(self.track_start, self.track_duration)]
+
+    def finish_tracks(self):
+        """Jump to the end of every ongoing animation: the tiles are at their targets immediately."""
+        for tile in range(self.num_tiles):
+            self.track_start[tile] = min(self.track_start[tile], self.time - self.track_duration[tile])
+        self.seek(self.time)
+
+    def update(self, dt: float):
+        """Advance the animation time by dt seconds, and update the positions and rotations of all the tiles."""
+        self.seek(self.time + dt)
+
+    def seek(self, time: float):
+        """Set the animation time, and evaluate the poses of all the tiles at that time."""
+        self.time = time
+        for tile in range(self.num_tiles):
+            progress = (time - self.track_start[tile]) / self.track_duration[tile]
+            if progress >= 1.0:
+                # finished tracks end exactly at their targets, without rounding errors
+                self.current_pixel_pos[tile] = self.target_pixel_pos[tile]
+                self.current_angle[tile] = self.target_angle[tile]
+                continue
+            progress = max(progress, 0.0)
+            progress *= progress * (3.0 - 2.0 * progress)  # ease in and out: 3p^2 - 2p^3
+
+            # the position: rotation around the pivot point, plus the correction
+            radians = math.radians(self.pivot_rotation_angle[tile] * progress)
+            cos, sin = math.cos(radians), math.sin(radians)
+            pivot_x, pivot_y = self.pivot_point[tile]
+            offset_x, offset_y = self.pivot_offset[tile]
+            correction_x, correction_y = self.position_correction[tile]
+            self.current_pixel_pos[tile] = (pivot_x + offset_x * cos - offset_y * sin + correction_x * progress,
+                                            pivot_y + offset_x * sin + offset_y * cos + correction_y * progress)
+
+            # the angle: linear from the start angle to the target angle
+            self.current_angle[tile] = (self.start_angle[tile] + self.angle_delta[tile] * progress) % 360
@@ -0,0 +1,115 @@
+from constants import TILE_ATLAS_PATH, TILE_ATLAS_SIZES, TILE_SIZE
+
+import math
+import os
+import struct
+import pygame
+
+# The tile atlas is a single file with every tile at several sizes, already rotated by the angles in ATLAS_ANGLES,
+# in raw RGBA, so the tiles of one size are loaded with one read, without decoding, scaling or rotating images.
+# The rest of the 30 degree steps are rotations by multiples of 90 degrees, which are exact and cheap.
+#
+# Layout (little-endian):
+#   header: magic, version, number of tiles, number of angles, number of sizes
+#   for each size: tile size, frame size, byte offset of its frames
+#   frames of a size: for each tile, for each angle, frame size x frame size RGBA pixels, row by row
+# A frame is larger than the tile, so that the rotated tile fits into it; the tile is in the center of the frame.
+#
+# The atlas is created from the tile images by running this file. It is not stored in the repository (it is large, and
+# can be created any time); without it, the application loads the images.
+ATLAS_MAGIC = b"HHTA"
+ATLAS_VERSION = 1
+ATLAS_ANGLES = (0, 30, 60)
+HEADER_FORMAT = "<4sIIII"
+SIZE_ENTRY_FORMAT = "<IIQ"
+
+
+def frame_size(tile_size: int) -> int:
+    """The side of the frames of the given tile size: the bounding box of the tile rotated by 30 degrees,
+    with the same (integer) margin on both sides."""
+    rotated_size = math.ceil(tile_size * (math.cos(math.radians(30)) + math.sin(math.radians(30))))
+    return tile_size + 2 * math.ceil((rotated_size - tile_size) / 2)
+
+
+def _choose_size(entries: list[tuple[int, int, int]], tile_size: int) -> tuple[int, int, int]:
+    """The exact tile size if present; otherwise the smallest larger one (scaling down looks better), or the largest."""
+    larger = [entry for entry in entries if entry[0] >= tile_size]
+    return min(larger) if larger else max(entries)
+
+
+def load_tile_atlas(path=TILE_ATLAS_PATH, tile_size=TILE_SIZE, num_tiles=8) -> tuple[list[pygame.surface.Surface], list[dict[int, pygame.surface.Surface]]] | None:
+    """Load the tiles of the given size from the atlas: return the tile images, and for each tile, its rotated surfaces
+    at the 30 degree steps (angle -> surface, like RotationCache.get). Return None if there is no valid atlas (for example,
+    it is missing, truncated or created for other tiles), so the application falls back to the tile images.
+    The display mode must be set before, as the surfaces are converted to the display format."""
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        try:
+            magic, version, atlas_num_tiles, num_angles, num_sizes = struct.unpack(HEADER_FORMAT, f.read(struct.calcsize(HEADER_FORMAT)))
+            if magic != ATLAS_MAGIC or version != ATLAS_VERSION or num_sizes == 0 \
+                    or atlas_num_tiles != num_tiles or num_angles != len(ATLAS_ANGLES):
+                return None
+            entry_size = struct.calcsize(SIZE_ENTRY_FORMAT)
+            entries = [struct.unpack(SIZE_ENTRY_FORMAT, f.read(entry_size)) for _ in range(num_sizes)]
+        except struct.error:
+            return None  # the header is truncated
+        atlas_tile_size, size, offset = _choose_size(entries, tile_size)
+        frame_bytes = size * size * 4
+        if not 0 < atlas_tile_size <= size or offset + num_tiles * num_angles * frame_bytes > os.path.getsize(path):
+            return None  # the frames are truncated, or the size entry is corrupt
+        f.seek(offset)
+        data = memoryview(f.read(num_tiles * num_angles * frame_bytes))
+
+    # if the atlas does not have the exact size, the frames are scaled (once, at loading)
+    scale = tile_size / atlas_tile_size
+    scaled_size = round(size * scale)
+    images, rotations = [], []
+    for tile in range(num_tiles):
+        frames = {}
+        for i, angle in enumerate(ATLAS_ANGLES):
+            start = (tile * num_angles + i) * frame_bytes
+            frame = pygame.image.frombuffer(data[start:start + frame_bytes], (size, size), "RGBA").convert_alpha()
+            if scaled_size != size:
+                frame = pygame.transform.smoothscale(frame, (scaled_size, scaled_size))
+            for quarter_turns in range(4):
+                frames[(angle + 90 * quarter_turns) % 360] = pygame.transform.rotate(frame, -90 * quarter_turns)
+        rotations.append(frames)
+        # the unrotated tile is the center of the first frame
+        margin = (scaled_size - tile_size) // 2
+        images.append(frames[0].subsurface((margin, margin, tile_size, tile_size)).copy())
+    return images, rotations
+
+
+def create_tile_atlas(path=TILE_ATLAS_PATH, tile_sizes=TILE_ATLAS_SIZES, num_tiles=8):
+    """Create the atlas from the tile images: every tile at every size, rotated clockwise by the angles in ATLAS_ANGLES."""
+    images = [pygame.image.load(f"tile_images/{i+1}.png") for i in range(num_tiles)]
+    header_size = struct.calcsize(HEADER_FORMAT) + len(tile_sizes) * struct.calcsize(SIZE_ENTRY_FORMAT)
+
+    sections, size_entries, offset = [], [], header_size
+    for tile_size in tile_sizes:
+        size = frame_size(tile_size)
+        frames = []
+        for image in images:
+            tile = pygame.transform.smoothscale(image, (tile_size, tile_size))
+            canvas = pygame.Surface((size, size), pygame.SRCALPHA)
+            # the tile is copied into the transparent canvas as it is, without blending
+            canvas.blit(tile, ((size - tile_size) // 2, (size - tile_size) // 2), special_flags=pygame.BLEND_RGBA_MAX)
+            for angle in ATLAS_ANGLES:
+                # the rotated canvas is larger; the frame is its center
+                rotated = pygame.transform.rotozoom(canvas, -angle, 1.0)
+                frame = rotated.subsurface(((rotated.get_width() - size) // 2, (rotated.get_height() - size) // 2, size, size))
+                frames.append(pygame.image.tobytes(frame, "RGBA"))
+        section = b"".join(frames)
+        size_entries.append(struct.pack(SIZE_ENTRY_FORMAT, tile_size, size, offset))
+        sections.append(section)
+        offset += len(section)
+
+    with open(path, "wb") as f:
+        f.write(struct.pack(HEADER_FORMAT, ATLAS_MAGIC, ATLAS_VERSION, len(images), len(ATLAS_ANGLES), len(tile_sizes)))
+        f.writelines(size_entries)
+        f.writelines(sections)
+
+
+if __name__ == "__main__":
+    create_tile_atlas()
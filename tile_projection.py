@@ -0,0 +1,87 @@
+from constants import TILE_CONFIGS, STICKER_COLORS
+from coordinates import CORNERS
+from move_compiler import NUM_SLOTS
+
+import itertools
+import numpy as np
+
+# Projection of the 2D tile layout onto the 24 stickers of the 3D model, to compare the two representations.
+#
+# A tile shows the three stickers of a corner: its square i (with the i-th color of TILE_CONFIGS) points to the direction
+# 45 + tilt + 120 * i + angle degrees on the screen, where angle is the rotation of the tile. In the solved layout,
+# every tile is on its home slot with angle 0, so the directions of the squares on a slot tell which sticker of the
+# corner is shown in each direction. The directions are always multiples of 30 degrees (apart from the common 45),
+# so they are handled as steps of 30 degrees.
+NUM_DIRECTIONS = 12
+NO_STICKER = -1
+
+_FACE_OF_COLOR = {color: sticker // 4 for sticker, color in enumerate(STICKER_COLORS)}
+# TILE_FACES[t, i]: the face (the index of the side in STICKER_COLORS order) of the i-th square of tile t
+TILE_FACES = np.array([[_FACE_OF_COLOR[color] for color in config[:3]] for config in TILE_CONFIGS], dtype=np.int8)
+_TILTS = np.array([config[3] // 30 for config in TILE_CONFIGS])
+
+
+def _slot_stickers() -> np.ndarray:
+    """SLOT_STICKERS[s, d]: the sticker position shown in direction d on slot s, or NO_STICKER."""
+    slot_stickers = np.full((NUM_SLOTS, NUM_DIRECTIONS), NO_STICKER, dtype=np.int8)
+    for slot in range(NUM_SLOTS):
+        # the corner of the slot is the one with the same faces as its home tile
+        corner = next(corner for corner in CORNERS if {sticker // 4 for sticker in corner} == set(TILE_FACES[slot].tolist()))
+        for i, face in enumerate(TILE_FACES[slot]):
+            direction = (_TILTS[slot] + 4 * i) % NUM_DIRECTIONS
+            slot_stickers[slot, direction] = next(sticker for sticker in corner if sticker // 4 == face)
+    return slot_stickers
+
+
+def _projection() -> np.ndarray:
+    """PROJECTION[t, s, a, i]: the sticker position of the i-th square of tile t on slot s, rotated by a * 30 degrees."""
+    projection = np.empty((NUM_SLOTS, NUM_SLOTS, NUM_DIRECTIONS, 3), dtype=np.int8)
+    for tile, slot, step, i in itertools.product(range(NUM_SLOTS), range(NUM_SLOTS), range(NUM_DIRECTIONS), range(3)):
+        projection[tile, slot, step, i] = SLOT_STICKERS[slot, (_TILTS[tile] + 4 * i + step) % NUM_DIRECTIONS]
+    return projection
+
+
+SLOT_STICKERS = _slot_stickers()
+PROJECTION = _projection()
+
+
+def project_faces(slots: np.ndarray, angles: np.ndarray) -> np.ndarray:
+    """Project a batch of tile layouts onto the stickers. slots[n, t] is the grid slot of tile t, and angles[n, t] is its
+    target angle in degrees. Return the (N, 24) faces of the stickers, where NO_STICKER marks the stickers that no tile
+    shows (the tiles are not rotated to a valid orientation for their slots)."""
+    slots, angles = np.atleast_2d(slots), np.atleast_2d(angles)
+    num_layouts = slots.shape[0]
+    steps = (np.asarray(angles) // 30).astype(np.int64) % NUM_DIRECTIONS
+    positions = PROJECTION[np.arange(NUM_SLOTS), slots, steps].reshape(num_layouts, -1).astype(np.int64)  # (N, 24)
+    # a square in an invalid direction is written into an extra column, which is dropped in the end
+    positions[positions == NO_STICKER] = len(STICKER_COLORS)
+    faces = np.full((num_layouts, len(STICKER_COLORS) + 1), NO_STICKER, dtype=np.int8)
+    np.put_along_axis(faces, positions, np.broadcast_to(TILE_FACES.reshape(1, -1), positions.shape), axis=1)
+    return faces[:, :len(STICKER_COLORS)]
+
+
+def sticker_faces(states: np.ndarray) -> np.ndarray:
+    """The faces of the stickers of a batch of puzzle_state.py states."""
+    return (np.asarray(states) // 4).astype(np.int8)
+
+
+# _PLACEMENTS[t, s, a]: whether tile t can be shown on slot s rotated by a * 30 degrees (all its squares have a sticker)
+_PLACEMENTS = np.all(PROJECTION != NO_STICKER, axis=3)
+_PLACEMENT_STICKERS = np.where(PROJECTION == NO_STICKER, 0, PROJECTION).astype(np.intp)
+
+
+def tile_layouts(states: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """The inverse of project_faces: the tile layout that shows a batch of puzzle_state.py states. Return the (N, 8)
+    grid slots of the tiles and their angles in degrees, in [0, 360).
+    Raise a ValueError if some of the states cannot be shown by the tiles (for example, a corner of the state is twisted
+    in a way that no tile rotation shows, or its stickers are not a permutation)."""
+    faces = sticker_faces(np.atleast_2d(states))
+    # every tile shows exactly one of its placements: the one where the stickers have the faces of its squares
+    shown = faces[:, _PLACEMENT_STICKERS] == TILE_FACES[None, :, None, None, :]  # (N, tile, slot, step, square)
+    matches = (np.all(shown, axis=4) & _PLACEMENTS).reshape(faces.shape[0], NUM_SLOTS, -1)
+    slots, steps = np.divmod(np.argmax(matches, axis=2), NUM_DIRECTIONS)
+    # argmax picks the first placement (slot 0, angle 0) for a tile without any, and two tiles can match the same slot
+    invalid = ~np.all(np.any(matches, axis=2), axis=1) | np.any(np.sort(slots, axis=1) != np.arange(NUM_SLOTS), axis=1)
+    if invalid.any():
+        raise ValueError(f"The tiles cannot show the states at indices {np.flatnonzero(invalid).tolist()}")
+    return slots, steps * 30